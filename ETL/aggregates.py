@@ -0,0 +1,135 @@
+"""Tablas agregadas (récords, head-to-head y posiciones) calculadas desde matches y sets."""
+import sqlite3
+from typing import Iterable, Optional
+
+
+def _team_matches_cte(match_filter: str) -> str:
+    """CTE con una fila por equipo y partido terminado, filtrando los partidos con `match_filter`.
+    
+    Los puntos se suman por partido con subqueries sobre idx_sets_match, así el
+    costo es proporcional a los partidos filtrados y no a toda la tabla sets.
+    """
+    points_a = "(SELECT COALESCE(SUM(points_team_a), 0) FROM sets s WHERE s.match_no = m.match_no)"
+    points_b = "(SELECT COALESCE(SUM(points_team_b), 0) FROM sets s WHERE s.match_no = m.match_no)"
+    return f"""
+    WITH team_matches AS (
+        SELECT m.season, m.tournament_no, m.pool_no,
+               m.team_a_no AS team_no, m.team_b_no AS opponent_no,
+               m.winner_team_no = m.team_a_no AS won,
+               m.team_a_score AS sets_won, m.team_b_score AS sets_lost,
+               {points_a} AS points_won, {points_b} AS points_lost
+        FROM matches m
+        WHERE m.winner_team_no IS NOT NULL AND ({match_filter})
+        UNION ALL
+        SELECT m.season, m.tournament_no, m.pool_no,
+               m.team_b_no, m.team_a_no,
+               m.winner_team_no = m.team_b_no,
+               m.team_b_score, m.team_a_score,
+               {points_b}, {points_a}
+        FROM matches m
+        WHERE m.winner_team_no IS NOT NULL AND ({match_filter})
+    )
+    """
+
+
+_TOTALS = """
+    COUNT(*), SUM(won), COUNT(*) - SUM(won), SUM(sets_won), SUM(sets_lost),
+    SUM(points_won), SUM(points_lost), SUM(points_won) - SUM(points_lost)
+"""
+
+_TOTAL_COLUMNS = """
+    played INTEGER NOT NULL, won INTEGER NOT NULL, lost INTEGER NOT NULL,
+    sets_won INTEGER NOT NULL, sets_lost INTEGER NOT NULL,
+    points_won INTEGER NOT NULL, points_lost INTEGER NOT NULL, point_diff INTEGER NOT NULL
+"""
+
+
+def create_aggregate_tables(cursor: sqlite3.Cursor):
+    """Crea las tablas agregadas y sus índices."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS team_season_records (
+            team_no INTEGER NOT NULL, season INTEGER NOT NULL, {_TOTAL_COLUMNS},
+            PRIMARY KEY (team_no, season)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS head_to_head (
+            team_no INTEGER NOT NULL, opponent_no INTEGER NOT NULL, {_TOTAL_COLUMNS},
+            PRIMARY KEY (team_no, opponent_no)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS pool_standings (
+            pool_no INTEGER NOT NULL, team_no INTEGER NOT NULL, tournament_no INTEGER, {_TOTAL_COLUMNS},
+            PRIMARY KEY (pool_no, team_no)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pool_standings_tournament ON pool_standings(tournament_no)"
+    )
+
+
+def _fill_keys(conn: sqlite3.Connection, table: str, values: Iterable[int]):
+    """Carga claves afectadas en una tabla temporal."""
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table} (no INTEGER PRIMARY KEY)")
+    conn.execute(f"DELETE FROM {table}")
+    conn.executemany(f"INSERT OR IGNORE INTO {table} (no) VALUES (?)",
+                     [(v,) for v in values if v is not None])
+
+
+def refresh_aggregates(conn: sqlite3.Connection, teams: Optional[Iterable[int]] = None,
+                       pools: Optional[Iterable[int]] = None):
+    """Recalcula las tablas agregadas.
+
+    Sin argumentos las reconstruye completas. Con `teams`/`pools` solo
+    recalcula las filas de esos equipos y pools (los afectados por los
+    partidos que cambiaron). No hace commit: corre dentro de la transacción
+    del llamador.
+    """
+    if teams is None and pools is None:
+        conn.execute("DELETE FROM team_season_records")
+        conn.execute("DELETE FROM head_to_head")
+        conn.execute("DELETE FROM pool_standings")
+        team_filter = h2h_filter = "1"
+        team_matches = "1"
+        pool_filter = "pool_no IS NOT NULL"
+        pool_matches = "m.pool_no IS NOT NULL"
+    else:
+        _fill_keys(conn, "temp.affected_teams", teams or ())
+        _fill_keys(conn, "temp.affected_pools", pools or ())
+        conn.execute("DELETE FROM team_season_records WHERE team_no IN (SELECT no FROM temp.affected_teams)")
+        conn.execute("""
+            DELETE FROM head_to_head
+            WHERE team_no IN (SELECT no FROM temp.affected_teams)
+               OR opponent_no IN (SELECT no FROM temp.affected_teams)
+        """)
+        conn.execute("DELETE FROM pool_standings WHERE pool_no IN (SELECT no FROM temp.affected_pools)")
+        team_filter = "team_no IN (SELECT no FROM temp.affected_teams)"
+        h2h_filter = ("team_no IN (SELECT no FROM temp.affected_teams) "
+                      "OR opponent_no IN (SELECT no FROM temp.affected_teams)")
+        pool_filter = "pool_no IN (SELECT no FROM temp.affected_pools)"
+        team_matches = ("m.team_a_no IN (SELECT no FROM temp.affected_teams) "
+                        "OR m.team_b_no IN (SELECT no FROM temp.affected_teams)")
+        pool_matches = "m.pool_no IN (SELECT no FROM temp.affected_pools)"
+
+    conn.execute(f"""
+        INSERT INTO team_season_records
+        {_team_matches_cte(team_matches)}
+        SELECT team_no, season, {_TOTALS} FROM team_matches
+        WHERE season IS NOT NULL AND ({team_filter})
+        GROUP BY team_no, season
+    """)
+    conn.execute(f"""
+        INSERT INTO head_to_head
+        {_team_matches_cte(team_matches)}
+        SELECT team_no, opponent_no, {_TOTALS} FROM team_matches
+        WHERE {h2h_filter}
+        GROUP BY team_no, opponent_no
+    """)
+    conn.execute(f"""
+        INSERT INTO pool_standings
+        {_team_matches_cte(pool_matches)}
+        SELECT pool_no, team_no, MAX(tournament_no), {_TOTALS} FROM team_matches
+        WHERE {pool_filter}
+        GROUP BY pool_no, team_no
+    """)
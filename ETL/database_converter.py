@@ -1,40 +1,298 @@
 """Convertidor de datos JSON a base de datos SQLite."""
 import sqlite3
 import json
-from typing import Dict, List, Optional
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 from pathlib import Path
 
+from aggregates import create_aggregate_tables, refresh_aggregates
+from search_index import create_search_index, refresh_search_index
+
+
+# Tamaño de lote de executemany en la carga por streaming
+STREAM_BATCH_SIZE = 5000
+# Bytes leídos del archivo JSON por cada lectura
+STREAM_CHUNK_SIZE = 1 << 16
+# Archivos de la BD particionada por temporada (ver shard_json_to_db)
+SHARD_MANIFEST = "manifest.json"
+SHARD_CATALOG = "catalog.db"
+
+
+class _JsonStreamReader:
+    """Lector incremental de un documento JSON con un objeto en el nivel superior."""
+    
+    _WHITESPACE = " \t\n\r"
+    
+    def __init__(self, f: TextIO, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+    
+    def _fill(self, size: Optional[int] = None) -> bool:
+        """Lee más datos del archivo descartando lo ya consumido."""
+        if self.eof:
+            return False
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+    
+    def peek(self) -> str:
+        """Devuelve el siguiente carácter no vacío sin consumirlo ('' al final)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self._WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+    
+    def expect(self, char: str):
+        """Consume el carácter esperado."""
+        if self.peek() != char:
+            raise ValueError(f"JSON inválido: se esperaba '{char}' en la posición {self.pos}")
+        self.pos += 1
+    
+    def value(self):
+        """Decodifica el siguiente valor completo, leyendo más datos si hace falta."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+                # Un número al final del buffer puede seguir en el próximo bloque
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            size *= 2
+            self._fill(size)
+
+
+def iter_json_document(f: TextIO, stream_keys: Tuple[str, ...] = ("matches",),
+                       chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Tuple[str, object]]:
+    """Recorre un objeto JSON sin cargarlo entero en memoria.
+    
+    Para las claves de `stream_keys` (que deben ser listas) emite cada elemento
+    por separado como (clave, elemento); el resto de claves se emite una vez
+    como (clave, valor). `chunk_size` son los caracteres de cada lectura.
+    """
+    reader = _JsonStreamReader(f, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key in stream_keys and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.peek() == ",":
+                        reader.expect(",")
+                        continue
+                    reader.expect("]")
+                    break
+        else:
+            yield key, reader.value()
+        if reader.peek() == ",":
+            reader.expect(",")
+            continue
+        reader.expect("}")
+        return
+
+
+class _BatchWriter:
+    """Acumula filas de una tabla y las escribe en lotes de executemany."""
+    
+    def __init__(self, conn: sqlite3.Connection, sql: str, batch_size: int = STREAM_BATCH_SIZE):
+        self.conn = conn
+        self.sql = sql
+        self.batch_size = batch_size
+        self.batch: List[tuple] = []
+        self.rows = 0
+        self.seconds = 0.0
+    
+    def add(self, row: tuple):
+        self.batch.append(row)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        if not self.batch:
+            return
+        start = time.perf_counter()
+        self.conn.executemany(self.sql, self.batch)
+        self.seconds += time.perf_counter() - start
+        self.rows += len(self.batch)
+        self.batch = []
+
 
 class VolleyballDBConverter:
     """Convierte datos JSON de partidos a base de datos SQLite."""
     
+    # Índices que se crean sobre el schema
+    INDICES = [
+        "CREATE INDEX IF NOT EXISTS idx_matches_tournament ON matches(tournament_no)",
+        # Equipo + fecha: los partidos de un equipo en un rango se leen en orden
+        "CREATE INDEX IF NOT EXISTS idx_matches_team_a_date ON matches(team_a_no, match_date_utc)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_team_b_date ON matches(team_b_no, match_date_utc)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_date ON matches(match_date_utc)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_winner ON matches(winner_team_no)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_pool ON matches(pool_no)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_round ON matches(round_no)",
+        "CREATE INDEX IF NOT EXISTS idx_sets_match ON sets(match_no)",
+        "CREATE INDEX IF NOT EXISTS idx_pools_tournament ON pools(tournament_no)",
+        "CREATE INDEX IF NOT EXISTS idx_rounds_tournament ON rounds(tournament_no)",
+        "CREATE INDEX IF NOT EXISTS idx_teams_code ON teams(code)",
+        "CREATE INDEX IF NOT EXISTS idx_teams_tournament_code ON teams(tournament_code)"
+    ]
+    
+    # Caché de páginas del modo bulk (en KiB)
+    BULK_CACHE_SIZE_KIB = 256 * 1024
+    
+    # Segundos que una escritura espera un lock antes de fallar con "database is locked"
+    BUSY_TIMEOUT_SECONDS = 5.0
+    
     def __init__(self, db_path: str = "volleyball_data.db"):
         self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self.load_stats: Dict[str, Dict] = {}
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Abre una conexión con foreign keys activas y espera ante locks."""
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT_SECONDS)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+    
+    def enable_wal(self):
+        """Pasa la BD a journal WAL (persistente en el archivo).
+        
+        En WAL los lectores (el servidor MCP) no bloquean al writer ni al
+        revés: cada lectura ve la última transacción confirmada al empezar.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        finally:
+            conn.close()
+    
+    @contextmanager
+    def _connection(self):
+        """Usa la conexión del bulk load si está activa; si no, abre una y hace commit al final."""
+        if self._conn is not None:
+            yield self._conn
+            return
+        conn = self._connect()
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
     
     def _execute_sql(self, sql: str, params: tuple = None):
         """Ejecuta SQL y retorna cursor."""
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("PRAGMA foreign_keys = ON")
-        cursor = conn.cursor()
-        cursor.execute(sql, params or ())
-        conn.commit()
-        conn.close()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params or ())
         return cursor
     
     def _execute_many(self, sql: str, params_list: List[tuple]):
         """Ejecuta SQL múltiples veces."""
-        conn = sqlite3.connect(self.db_path)
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(sql, params_list)
+    
+    @contextmanager
+    def bulk_load(self, fresh: bool = True):
+        """Agrupa toda la carga en una sola conexión y una sola transacción.
+        
+        Usa PRAGMAs de carga masiva (sin journal si la BD es nueva, WAL si no,
+        synchronous=OFF y caché grande). Al terminar hace commit y ANALYZE.
+        Una BD existente que ya estaba en WAL (ver `enable_wal`) queda en WAL.
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=self.BUSY_TIMEOUT_SECONDS)
+        previous_mode = conn.execute("PRAGMA journal_mode").fetchone()[0].lower()
+        conn.execute(f"PRAGMA journal_mode = {'OFF' if fresh else 'WAL'}")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(f"PRAGMA cache_size = {-self.BULK_CACHE_SIZE_KIB}")
+        conn.execute("PRAGMA temp_store = MEMORY")
         conn.execute("PRAGMA foreign_keys = ON")
-        cursor = conn.cursor()
-        cursor.executemany(sql, params_list)
-        conn.commit()
-        conn.close()
+        self._conn = conn
+        try:
+            conn.execute("BEGIN")
+            yield conn
+            conn.execute("COMMIT")
+            conn.execute("ANALYZE")
+            if not fresh and previous_mode != "wal":
+                # Vuelve a journal en archivo para que los lectores de solo lectura no necesiten el -shm
+                conn.execute("PRAGMA journal_mode = DELETE")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._conn = None
+            conn.close()
     
-    def create_schema(self):
+    def _timed_insert(self, table: str, insert, *args) -> int:
+        """Ejecuta un insert_* y registra sus filas por segundo."""
+        start = time.perf_counter()
+        rows = insert(*args) or 0
+        elapsed = time.perf_counter() - start
+        self.load_stats[table] = {
+            "rows": rows,
+            "seconds": round(elapsed, 4),
+            "rows_per_second": round(rows / elapsed) if elapsed > 0 else rows,
+        }
+        return rows
+    
+    def create_schema(self, create_indexes: bool = True):
         """Crea todas las tablas con relaciones y foreign keys."""
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("PRAGMA foreign_keys = ON")
-        cursor = conn.cursor()
+        with self._connection() as conn:
+            self._create_tables(conn.cursor(), create_indexes)
+        print("Schema creado con índices" if create_indexes else "Schema creado (índices pendientes)")
+    
+    def create_indexes(self, cursor: Optional[sqlite3.Cursor] = None):
+        """Crea los índices; en bulk load se llama después de insertar los datos."""
+        if cursor is None:
+            with self._connection() as conn:
+                self.create_indexes(conn.cursor())
+            print("Índices creados")
+            return
+        for idx_sql in self.INDICES:
+            cursor.execute(idx_sql)
+    
+    def refresh_aggregates(self, teams: Optional[Iterable[int]] = None,
+                           pools: Optional[Iterable[int]] = None):
+        """Recalcula las tablas agregadas (todas, o solo las de los equipos/pools dados)."""
+        start = time.perf_counter()
+        with self._connection() as conn:
+            refresh_aggregates(conn, teams, pools)
+        print(f"Tablas agregadas actualizadas en {time.perf_counter() - start:.2f}s")
+    
+    def refresh_search_index(self, teams: Optional[Iterable[int]] = None,
+                             tournaments: Optional[Iterable[int]] = None):
+        """Sincroniza el índice FTS5 de equipos y torneos."""
+        with self._connection() as conn:
+            refresh_search_index(conn, teams, tournaments)
+    
+    def _create_tables(self, cursor: sqlite3.Cursor, create_indexes: bool):
+        """Crea las tablas (y opcionalmente los índices) con el cursor dado."""
         
         # Tablas
         cursor.execute("""
@@ -102,39 +360,75 @@ class VolleyballDBConverter:
             )
         """)
         
-        # Índices
-        indices = [
-            "CREATE INDEX IF NOT EXISTS idx_matches_tournament ON matches(tournament_no)",
-            "CREATE INDEX IF NOT EXISTS idx_matches_team_a ON matches(team_a_no)",
-            "CREATE INDEX IF NOT EXISTS idx_matches_team_b ON matches(team_b_no)",
-            "CREATE INDEX IF NOT EXISTS idx_matches_date ON matches(match_date_utc)",
-            "CREATE INDEX IF NOT EXISTS idx_matches_winner ON matches(winner_team_no)",
-            "CREATE INDEX IF NOT EXISTS idx_matches_pool ON matches(pool_no)",
-            "CREATE INDEX IF NOT EXISTS idx_matches_round ON matches(round_no)",
-            "CREATE INDEX IF NOT EXISTS idx_sets_match ON sets(match_no)",
-            "CREATE INDEX IF NOT EXISTS idx_pools_tournament ON pools(tournament_no)",
-            "CREATE INDEX IF NOT EXISTS idx_rounds_tournament ON rounds(tournament_no)",
-            "CREATE INDEX IF NOT EXISTS idx_teams_code ON teams(code)",
-            "CREATE INDEX IF NOT EXISTS idx_teams_tournament_code ON teams(tournament_code)"
-        ]
-        
-        for idx_sql in indices:
-            cursor.execute(idx_sql)
+        # Hash del contenido de origen de cada entidad, para la carga incremental
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS row_hashes (
+                entity TEXT NOT NULL, key INTEGER NOT NULL, hash TEXT NOT NULL,
+                PRIMARY KEY (entity, key)
+            ) WITHOUT ROWID
+        """)
+        
+        # Tablas agregadas (récords, head-to-head, posiciones por pool)
+        create_aggregate_tables(cursor)
         
-        conn.commit()
-        conn.close()
-        print("Schema creado con índices")
+        # Índice de búsqueda por nombre de equipos y torneos
+        create_search_index(cursor)
+        
+        if create_indexes:
+            self.create_indexes(cursor)
     
-    def insert_tournaments(self, tournaments: List[Dict]):
-        """Inserta torneos."""
-        sql = """INSERT OR REPLACE INTO tournaments (
+    # SQL de inserción de cada tabla
+    SQL_TOURNAMENTS = """INSERT OR REPLACE INTO tournaments (
             no, name, start_date, end_date, discipline, discipline_text, city, country, country_name,
             gender, gender_text, competition_short_name, competition_full_name, competition_slug,
             logo, logo_square, logo_url, tickets_url, volley_ball_tv_link, you_tube_link,
             store_link, url, sub_competition_type
         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
-        
-        params = [(
+    
+    SQL_TEAMS = """INSERT OR REPLACE INTO teams (
+            no, code, name, country, translated_name, img, img_squared, alt_text,
+            discipline, is_club, tournament_code
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+    
+    SQL_POOLS = "INSERT OR REPLACE INTO pools (no, name, code, tournament_no) VALUES (?, ?, ?, ?)"
+    
+    SQL_ROUNDS = "INSERT OR REPLACE INTO rounds (no, name, code, tournament_no) VALUES (?, ?, ?, ?)"
+    
+    SQL_MATCHES = """INSERT OR REPLACE INTO matches (
+            match_no, match_no_in_tournament, tournament_no, team_a_no, team_b_no, winner_team_no,
+            team_a_score, team_b_score, match_date_utc, match_date_time_local, match_status,
+            current_set_no, competition_slug, competition_short_name, competition_full_name,
+            round_no, pool_no, city, country_code, country, gender, gender_text, discipline,
+            discipline_text, pinned_competition, is_match_tbd, tournament_type, season,
+            ticket_link, volley_ball_tv_link, you_tube_link, match_center_url, world_ranking_url,
+            team_a_replacement_tbd, team_b_replacement_tbd, phase, court, court_text
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+    
+    SQL_SETS = "INSERT OR REPLACE INTO sets (match_no, set_number, points_team_a, points_team_b) VALUES (?, ?, ?, ?)"
+    
+    SQL_ROW_HASHES = "INSERT OR REPLACE INTO row_hashes (entity, key, hash) VALUES (?, ?, ?)"
+    
+    @staticmethod
+    def _content_hash(obj: Dict) -> str:
+        """Hash estable del contenido JSON de una entidad."""
+        payload = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    
+    def _hash_rows(self, data: Dict) -> List[tuple]:
+        """Filas de row_hashes para partidos, equipos y torneos."""
+        rows = []
+        for entity, key, items in (("match", "matchNo", data.get("matches")),
+                                   ("team", "no", data.get("allTeams")),
+                                   ("tournament", "no", data.get("allTournaments"))):
+            for item in items or []:
+                if item.get(key):
+                    rows.append((entity, item[key], self._content_hash(item)))
+        return rows
+    
+    @staticmethod
+    def _tournament_row(t: Dict) -> tuple:
+        """Parámetros de un torneo."""
+        return (
             t.get("no"), t.get("name"), t.get("startDate"), t.get("endDate"),
             t.get("discipline"), t.get("disciplineText"), t.get("city"), t.get("country"),
             t.get("countryName"), t.get("gender"), t.get("genderText"),
@@ -142,135 +436,494 @@ class VolleyballDBConverter:
             t.get("logo"), t.get("logoSquare"), t.get("logoUrl"), t.get("ticketsUrl"),
             t.get("volleyBallTvLink"), t.get("youTubeLink"), t.get("storeLink"), t.get("url"),
             t.get("subCompetitionType")
-        ) for t in tournaments]
+        )
+    
+    @staticmethod
+    def _team_row(t: Dict) -> tuple:
+        """Parámetros de un equipo."""
+        return (
+            t.get("no"), t.get("code"), t.get("name"), t.get("country"), t.get("translatedName"),
+            t.get("img"), t.get("imgSquared"), t.get("altText"), t.get("discipline"),
+            1 if t.get("isClub") else 0, t.get("tournamentCode")
+        )
+    
+    @staticmethod
+    def _pool_row(match: Dict) -> Optional[tuple]:
+        """Parámetros del pool de un partido (None si no tiene)."""
+        pool = match.get("pool")
+        if pool and pool.get("no"):
+            return (pool.get("no"), pool.get("name"), pool.get("code"), match.get("tournamentNo"))
+        return None
+    
+    @staticmethod
+    def _round_row(match: Dict) -> Optional[tuple]:
+        """Parámetros del round de un partido (None si no tiene)."""
+        round_no = match.get("roundNo")
+        if round_no:
+            return (round_no, match.get("roundName"), match.get("roundCode"), match.get("tournamentNo"))
+        return None
+    
+    @staticmethod
+    def _match_row(match: Dict) -> tuple:
+        """Parámetros de un partido."""
+        pool = match.get("pool", {})
+        return (
+            match.get("matchNo"), match.get("matchNoInTournament"), match.get("tournamentNo"),
+            match.get("teamANo"), match.get("teamBNo"), match.get("winnerTeamNo"),
+            match.get("teamAScore"), match.get("teamBScore"), match.get("matchDateUtc"),
+            match.get("matchDateTimeLocal"), match.get("matchStatus"), match.get("currentSetNo"),
+            match.get("competitionSlug"), match.get("competitionShortName"), match.get("competitionFullName"),
+            match.get("roundNo"), pool.get("no") if pool else None, match.get("city"),
+            match.get("countryCode"), match.get("country"), match.get("gender"), match.get("genderText"),
+            match.get("discipline"), match.get("disciplineText"),
+            1 if match.get("pinnedCompetition") else 0, 1 if match.get("isMatchTBD") else 0,
+            match.get("tournamentType"), match.get("season"), match.get("ticketLink"),
+            match.get("volleyBallTvLink"), match.get("youTubeLink"), match.get("matchCenterUrl"),
+            match.get("worldRankingUrl"), match.get("teamAReplacementTBD"), match.get("teamBReplacementTBD"),
+            match.get("phase"), match.get("court"), match.get("courtText")
+        )
+    
+    @staticmethod
+    def _set_rows(match: Dict) -> List[tuple]:
+        """Parámetros de los sets jugados de un partido."""
+        rows = []
+        match_no = match.get("matchNo")
+        for set_data in match.get("sets", []):
+            points_a = set_data.get("pointsTeamA", 0)
+            points_b = set_data.get("pointsTeamB", 0)
+            if points_a > 0 or points_b > 0:
+                rows.append((match_no, set_data.get("no"), points_a, points_b))
+        return rows
+    
+    def insert_tournaments(self, tournaments: List[Dict]):
+        """Inserta torneos."""
+        params = [self._tournament_row(t) for t in tournaments]
         
-        self._execute_many(sql, params)
+        self._execute_many(self.SQL_TOURNAMENTS, params)
         print(f"Insertados {len(tournaments)} torneos")
+        return len(tournaments)
     
     def insert_teams(self, teams: List[Dict]):
         """Inserta equipos."""
-        sql = """INSERT OR REPLACE INTO teams (
-            no, code, name, country, translated_name, img, img_squared, alt_text,
-            discipline, is_club, tournament_code
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
-        
-        params = [(
-            t.get("no"), t.get("code"), t.get("name"), t.get("country"), t.get("translatedName"),
-            t.get("img"), t.get("imgSquared"), t.get("altText"), t.get("discipline"),
-            1 if t.get("isClub") else 0, t.get("tournamentCode")
-        ) for t in teams]
+        params = [self._team_row(t) for t in teams]
         
-        self._execute_many(sql, params)
+        self._execute_many(self.SQL_TEAMS, params)
         print(f"Insertados {len(teams)} equipos")
+        return len(teams)
     
     def insert_pools(self, matches: List[Dict]):
         """Extrae e inserta pools únicos."""
         pools = {}
         for match in matches:
-            pool = match.get("pool")
-            if pool and pool.get("no"):
-                pool_no = pool.get("no")
-                if pool_no not in pools:
-                    pools[pool_no] = (
-                        pool_no, pool.get("name"), pool.get("code"), match.get("tournamentNo")
-                    )
+            row = self._pool_row(match)
+            if row and row[0] not in pools:
+                pools[row[0]] = row
         
         if pools:
-            sql = "INSERT OR REPLACE INTO pools (no, name, code, tournament_no) VALUES (?, ?, ?, ?)"
-            self._execute_many(sql, list(pools.values()))
+            self._execute_many(self.SQL_POOLS, list(pools.values()))
             print(f"Insertados {len(pools)} pools")
+        return len(pools)
     
     def insert_rounds(self, matches: List[Dict]):
         """Extrae e inserta rounds únicos."""
         rounds = {}
         for match in matches:
-            round_no = match.get("roundNo")
-            if round_no and round_no not in rounds:
-                rounds[round_no] = (
-                    round_no, match.get("roundName"), match.get("roundCode"), match.get("tournamentNo")
-                )
+            row = self._round_row(match)
+            if row and row[0] not in rounds:
+                rounds[row[0]] = row
         
         if rounds:
-            sql = "INSERT OR REPLACE INTO rounds (no, name, code, tournament_no) VALUES (?, ?, ?, ?)"
-            self._execute_many(sql, list(rounds.values()))
+            self._execute_many(self.SQL_ROUNDS, list(rounds.values()))
             print(f"Insertados {len(rounds)} rounds")
+        return len(rounds)
     
     def insert_matches(self, matches: List[Dict]):
         """Inserta partidos."""
-        sql = """INSERT OR REPLACE INTO matches (
-            match_no, match_no_in_tournament, tournament_no, team_a_no, team_b_no, winner_team_no,
-            team_a_score, team_b_score, match_date_utc, match_date_time_local, match_status,
-            current_set_no, competition_slug, competition_short_name, competition_full_name,
-            round_no, pool_no, city, country_code, country, gender, gender_text, discipline,
-            discipline_text, pinned_competition, is_match_tbd, tournament_type, season,
-            ticket_link, volley_ball_tv_link, you_tube_link, match_center_url, world_ranking_url,
-            team_a_replacement_tbd, team_b_replacement_tbd, phase, court, court_text
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+        params = [self._match_row(match) for match in matches]
         
-        params = []
-        for match in matches:
-            pool = match.get("pool", {})
-            params.append((
-                match.get("matchNo"), match.get("matchNoInTournament"), match.get("tournamentNo"),
-                match.get("teamANo"), match.get("teamBNo"), match.get("winnerTeamNo"),
-                match.get("teamAScore"), match.get("teamBScore"), match.get("matchDateUtc"),
-                match.get("matchDateTimeLocal"), match.get("matchStatus"), match.get("currentSetNo"),
-                match.get("competitionSlug"), match.get("competitionShortName"), match.get("competitionFullName"),
-                match.get("roundNo"), pool.get("no") if pool else None, match.get("city"),
-                match.get("countryCode"), match.get("country"), match.get("gender"), match.get("genderText"),
-                match.get("discipline"), match.get("disciplineText"),
-                1 if match.get("pinnedCompetition") else 0, 1 if match.get("isMatchTBD") else 0,
-                match.get("tournamentType"), match.get("season"), match.get("ticketLink"),
-                match.get("volleyBallTvLink"), match.get("youTubeLink"), match.get("matchCenterUrl"),
-                match.get("worldRankingUrl"), match.get("teamAReplacementTBD"), match.get("teamBReplacementTBD"),
-                match.get("phase"), match.get("court"), match.get("courtText")
-            ))
-        
-        self._execute_many(sql, params)
+        self._execute_many(self.SQL_MATCHES, params)
         print(f"Insertados {len(matches)} partidos")
+        return len(matches)
+    
+    def insert_row_hashes(self, data: Dict):
+        """Guarda el hash de contenido de cada partido, equipo y torneo."""
+        params = self._hash_rows(data)
+        if params:
+            self._execute_many(self.SQL_ROW_HASHES, params)
+        return len(params)
     
     def insert_sets(self, matches: List[Dict]):
         """Inserta sets de cada partido."""
-        sql = "INSERT OR REPLACE INTO sets (match_no, set_number, points_team_a, points_team_b) VALUES (?, ?, ?, ?)"
-        
         params = []
         for match in matches:
-            match_no = match.get("matchNo")
-            for set_data in match.get("sets", []):
-                points_a = set_data.get("pointsTeamA", 0)
-                points_b = set_data.get("pointsTeamB", 0)
-                if points_a > 0 or points_b > 0:
-                    params.append((match_no, set_data.get("no"), points_a, points_b))
+            params.extend(self._set_rows(match))
         
         if params:
-            self._execute_many(sql, params)
+            self._execute_many(self.SQL_SETS, params)
             print(f"Insertados {len(params)} sets")
+        return len(params)
     
-    def convert_json_to_db(self, json_file: str, recreate: bool = True):
-        """Convierte archivo JSON completo a base de datos SQLite."""
+    def convert_json_to_db(self, json_file: str, recreate: bool = True, bulk: bool = True):
+        """Convierte archivo JSON completo a base de datos SQLite.
+        
+        Con `bulk=True` toda la carga va en una sola transacción, los índices se
+        crean después de insertar los datos y se ejecuta ANALYZE al final.
+        """
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.convert_data_to_db(data, recreate=recreate, bulk=bulk)
+    
+    def convert_data_to_db(self, data: Dict, recreate: bool = True, bulk: bool = True):
+        """Igual que `convert_json_to_db`, con el documento ya cargado en memoria."""
         if recreate and Path(self.db_path).exists():
             Path(self.db_path).unlink()
             print(f"BD eliminada: {self.db_path}")
         
-        self.create_schema()
+        self.load_stats = {}
+        if bulk:
+            with self.bulk_load(fresh=recreate):
+                self.create_schema(create_indexes=False)
+                self._insert_all(data)
+                self.create_indexes()
+                self.refresh_aggregates()
+                self.refresh_search_index()
+        else:
+            self.create_schema()
+            self._insert_all(data)
+            self.refresh_aggregates()
+            self.refresh_search_index()
         
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        for table, stats in self.load_stats.items():
+            print(f"  {table}: {stats['rows']} filas, {stats['rows_per_second']} filas/s")
+        print(f"\nConversión completada: {self.db_path}")
+    
+    def stream_json_to_db(self, json_file: str, recreate: bool = True,
+                          batch_size: int = STREAM_BATCH_SIZE):
+        """Convierte el JSON leyéndolo de forma incremental, en una sola pasada.
+        
+        Cada partido se reparte a los writers de pools, rounds, matches y sets,
+        que escriben en lotes de `batch_size`; la memoria no depende del tamaño
+        del archivo. Como `matches` suele venir antes que `allTeams` y
+        `allTournaments`, las foreign keys se validan al hacer commit.
+        """
+        if recreate and Path(self.db_path).exists():
+            Path(self.db_path).unlink()
+            print(f"BD eliminada: {self.db_path}")
+        
+        self.load_stats = {}
+        with self.bulk_load(fresh=recreate) as conn:
+            conn.execute("PRAGMA defer_foreign_keys = ON")
+            self.create_schema(create_indexes=False)
+            writers = {
+                "tournaments": _BatchWriter(conn, self.SQL_TOURNAMENTS, batch_size),
+                "teams": _BatchWriter(conn, self.SQL_TEAMS, batch_size),
+                "pools": _BatchWriter(conn, self.SQL_POOLS, batch_size),
+                "rounds": _BatchWriter(conn, self.SQL_ROUNDS, batch_size),
+                "matches": _BatchWriter(conn, self.SQL_MATCHES, batch_size),
+                "sets": _BatchWriter(conn, self.SQL_SETS, batch_size),
+                "row_hashes": _BatchWriter(conn, self.SQL_ROW_HASHES, batch_size),
+            }
+            seen_pools = set()
+            seen_rounds = set()
+            
+            with open(json_file, 'r', encoding='utf-8') as f:
+                for key, value in iter_json_document(f, stream_keys=("matches",)):
+                    if key == "matches":
+                        pool = self._pool_row(value)
+                        if pool and pool[0] not in seen_pools:
+                            seen_pools.add(pool[0])
+                            writers["pools"].add(pool)
+                        round_row = self._round_row(value)
+                        if round_row and round_row[0] not in seen_rounds:
+                            seen_rounds.add(round_row[0])
+                            writers["rounds"].add(round_row)
+                        writers["matches"].add(self._match_row(value))
+                        for set_row in self._set_rows(value):
+                            writers["sets"].add(set_row)
+                        data = {"matches": [value]}
+                    elif key == "allTeams":
+                        for team in value or []:
+                            writers["teams"].add(self._team_row(team))
+                        data = {"allTeams": value}
+                    elif key == "allTournaments":
+                        for tournament in value or []:
+                            writers["tournaments"].add(self._tournament_row(tournament))
+                        data = {"allTournaments": value}
+                    else:
+                        continue
+                    for hash_row in self._hash_rows(data):
+                        writers["row_hashes"].add(hash_row)
+            
+            for table, writer in writers.items():
+                writer.flush()
+                self.load_stats[table] = {
+                    "rows": writer.rows,
+                    "seconds": round(writer.seconds, 4),
+                    "rows_per_second": round(writer.rows / writer.seconds) if writer.seconds > 0 else writer.rows,
+                }
+            self.create_indexes()
+            self.refresh_aggregates()
+            self.refresh_search_index()
         
-        # Insertar en orden correcto (respetando foreign keys)
+        for table, stats in self.load_stats.items():
+            print(f"  {table}: {stats['rows']} filas, {stats['rows_per_second']} filas/s")
+        print(f"\nConversión completada: {self.db_path}")
+    
+    def _insert_all(self, data: Dict):
+        """Inserta todas las entidades en orden (respetando foreign keys)."""
         if data.get("allTournaments"):
-            self.insert_tournaments(data["allTournaments"])
+            self._timed_insert("tournaments", self.insert_tournaments, data["allTournaments"])
         
         if data.get("allTeams"):
-            self.insert_teams(data["allTeams"])
+            self._timed_insert("teams", self.insert_teams, data["allTeams"])
         
         if data.get("matches"):
-            self.insert_pools(data["matches"])
-            self.insert_rounds(data["matches"])
-            self.insert_matches(data["matches"])
-            self.insert_sets(data["matches"])
+            self._timed_insert("pools", self.insert_pools, data["matches"])
+            self._timed_insert("rounds", self.insert_rounds, data["matches"])
+            self._timed_insert("matches", self.insert_matches, data["matches"])
+            self._timed_insert("sets", self.insert_sets, data["matches"])
         
-        print(f"\nConversión completada: {self.db_path}")
+        self._timed_insert("row_hashes", self.insert_row_hashes, data)
+    
+    def _load_sync_state(self) -> Tuple[Dict[tuple, str], bool, bool]:
+        """Hashes guardados y si faltan los agregados o el índice de búsqueda."""
+        conn = self._connect()
+        try:
+            # Asegura las tablas nuevas (row_hashes) en BDs creadas antes
+            self._create_tables(conn.cursor(), create_indexes=True)
+            conn.commit()
+            known: Dict[tuple, str] = {}
+            for entity, key, value in conn.execute("SELECT entity, key, hash FROM row_hashes"):
+                known[(entity, key)] = value
+            aggregates_empty = (conn.execute("SELECT 1 FROM team_season_records LIMIT 1").fetchone() is None
+                                and conn.execute("SELECT 1 FROM matches LIMIT 1").fetchone() is not None)
+            search_empty = (conn.execute("SELECT 1 FROM search_index LIMIT 1").fetchone() is None
+                            and conn.execute("SELECT 1 FROM teams LIMIT 1").fetchone() is not None)
+        finally:
+            conn.close()
+        return known, aggregates_empty, search_empty
+    
+    def _apply_changes(self, changed: Dict[str, List[Dict]], hashes: List[tuple],
+                       aggregates_empty: bool = False, search_empty: bool = False):
+        """Escribe las entidades cambiadas en una sola transacción corta.
+        
+        Hace upsert de torneos, equipos y partidos, reemplaza los sets de los
+        partidos cambiados, guarda los hashes y refresca los agregados y el
+        índice de búsqueda solo para lo afectado.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA defer_foreign_keys = ON")
+            self._conn = conn
+            conn.execute("BEGIN IMMEDIATE")
+            matches = changed["match"]
+            # Equipos y pools afectados, antes y después del cambio, para refrescar los agregados
+            teams = set()
+            pools = set()
+            for m in matches:
+                teams.update((m.get("teamANo"), m.get("teamBNo")))
+                pools.add((m.get("pool") or {}).get("no"))
+                old = conn.execute(
+                    "SELECT team_a_no, team_b_no, pool_no FROM matches WHERE match_no = ?", (m["matchNo"],)
+                ).fetchone()
+                if old:
+                    teams.update(old[:2])
+                    pools.add(old[2])
+            self._execute_many(self.SQL_TOURNAMENTS, [self._tournament_row(t) for t in changed["tournament"]])
+            self._execute_many(self.SQL_TEAMS, [self._team_row(t) for t in changed["team"]])
+            self._execute_many(self.SQL_POOLS, list({r[0]: r for r in map(self._pool_row, matches) if r}.values()))
+            self._execute_many(self.SQL_ROUNDS, list({r[0]: r for r in map(self._round_row, matches) if r}.values()))
+            self._execute_many(self.SQL_MATCHES, [self._match_row(m) for m in matches])
+            self._execute_many("DELETE FROM sets WHERE match_no = ?", [(m["matchNo"],) for m in matches])
+            self._execute_many(self.SQL_SETS, [row for m in matches for row in self._set_rows(m)])
+            self._execute_many(self.SQL_ROW_HASHES, hashes)
+            if aggregates_empty:
+                refresh_aggregates(conn)
+            elif matches:
+                refresh_aggregates(conn, teams, pools)
+            if search_empty:
+                refresh_search_index(conn)
+            else:
+                refresh_search_index(conn, [t["no"] for t in changed["team"]],
+                                     [t["no"] for t in changed["tournament"]])
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._conn = None
+            conn.close()
+    
+    def load_row_hashes(self) -> Dict[tuple, str]:
+        """Hashes de contenido guardados: {(entidad, clave): hash}."""
+        return self._load_sync_state()[0]
+    
+    def apply_changes(self, data: Dict, known: Dict[tuple, str]) -> Dict[str, int]:
+        """Escribe solo las entidades de `data` cuyo hash difiere de `known`.
+        
+        `data` tiene el formato del scraper (matches, allTeams, allTournaments).
+        `known` es la foto anterior (por ejemplo `load_row_hashes()`) y se
+        actualiza con los hashes escritos, así que se puede reutilizar en la
+        siguiente llamada sin releer la BD.
+        
+        Returns:
+            Cantidad de partidos, equipos y torneos escritos.
+        """
+        changed: Dict[str, List[Dict]] = {"match": [], "team": [], "tournament": []}
+        hashes: List[tuple] = []
+        for key, entity, id_key in (("allTournaments", "tournament", "no"), ("allTeams", "team", "no"),
+                                    ("matches", "match", "matchNo")):
+            for value in data.get(key) or []:
+                if not value.get(id_key):
+                    continue
+                content_hash = self._content_hash(value)
+                if known.get((entity, value[id_key])) != content_hash:
+                    changed[entity].append(value)
+                    hashes.append((entity, value[id_key], content_hash))
+        if hashes:
+            self._apply_changes(changed, hashes)
+            known.update({(entity, key): value for entity, key, value in hashes})
+        return {
+            "matches": len(changed["match"]),
+            "teams": len(changed["team"]),
+            "tournaments": len(changed["tournament"]),
+        }
+    
+    def sync_json_to_db(self, json_file: str, batch_size: int = STREAM_BATCH_SIZE) -> Dict[str, int]:
+        """Aplica solo los cambios del JSON sobre una BD existente.
+        
+        Compara el hash de contenido de cada partido, equipo y torneo con el
+        guardado en `row_hashes` y, en una sola transacción corta, hace upsert
+        de las filas que cambiaron y reemplaza los sets solo de los partidos
+        modificados. Las filas que no vienen en el JSON no se borran.
+        
+        Returns:
+            Cantidad de partidos, equipos y torneos actualizados.
+        """
+        if not Path(self.db_path).exists():
+            self.stream_json_to_db(json_file, recreate=True, batch_size=batch_size)
+            return {table: self.load_stats[table]["rows"] for table in ("matches", "teams", "tournaments")}
+        
+        known, aggregates_empty, search_empty = self._load_sync_state()
+        
+        # Recorre el JSON en streaming y guarda solo las entidades que cambiaron
+        changed: Dict[str, List[Dict]] = {"match": [], "team": [], "tournament": []}
+        hashes: List[tuple] = []
+        with open(json_file, 'r', encoding='utf-8') as f:
+            for key, value in iter_json_document(f, stream_keys=("matches", "allTeams", "allTournaments")):
+                entity, id_key = {
+                    "matches": ("match", "matchNo"),
+                    "allTeams": ("team", "no"),
+                    "allTournaments": ("tournament", "no"),
+                }.get(key, (None, None))
+                if entity is None or not value.get(id_key):
+                    continue
+                content_hash = self._content_hash(value)
+                if known.get((entity, value[id_key])) != content_hash:
+                    changed[entity].append(value)
+                    hashes.append((entity, value[id_key], content_hash))
+        
+        summary = {
+            "matches": len(changed["match"]),
+            "teams": len(changed["team"]),
+            "tournaments": len(changed["tournament"]),
+        }
+        if not hashes:
+            print("Sin cambios")
+            return summary
+        
+        self._apply_changes(changed, hashes, aggregates_empty, search_empty)
+        
+        print(f"Actualizados {summary['matches']} partidos, {summary['teams']} equipos, "
+              f"{summary['tournaments']} torneos")
+        return summary
+
+def _match_season(match: Dict) -> int:
+    """Temporada de un partido (año de la fecha si no viene `season`)."""
+    if match.get("season"):
+        return int(match["season"])
+    date = match.get("matchDateUtc") or ""
+    return int(date[:4]) if date[:4].isdigit() else 0
+
+
+def _replace_db(converter_data: Dict, target: Path):
+    """Construye una BD en un archivo temporal y la reemplaza de forma atómica.
+    
+    El archivo nuevo tiene otro inode, así que el pool del servidor reabre sus
+    conexiones contra él sin ver estados intermedios.
+    """
+    tmp = target.with_name(target.name + ".tmp")
+    VolleyballDBConverter(db_path=str(tmp)).convert_data_to_db(converter_data, recreate=True)
+    os.replace(tmp, target)
+
+
+def shard_json_to_db(json_file: str, shard_dir: str = "shards",
+                     seasons: Optional[Iterable[int]] = None) -> Dict:
+    """Convierte el JSON en una BD por temporada más un catálogo.
+    
+    `catalog.db` tiene equipos, torneos y el índice de búsqueda; cada
+    `season_<año>.db` tiene los partidos, sets, pools, rondas y agregados de
+    esa temporada (con copia de equipos y torneos para las foreign keys).
+    `manifest.json` mapea temporadas y torneos a archivos. Con `seasons` solo
+    se reconstruyen esas temporadas y se conservan los demás shards;
+    `catalog.db` solo se reescribe si cambiaron equipos o torneos (un archivo
+    nuevo invalida las conexiones y el caché de resultados del servidor).
+    
+    Returns:
+        El manifiesto escrito.
+    """
+    shard_path = Path(shard_dir)
+    shard_path.mkdir(parents=True, exist_ok=True)
+    manifest_path = shard_path / SHARD_MANIFEST
+    
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    teams = data.get("allTeams") or []
+    tournaments = data.get("allTournaments") or []
+    
+    by_season: Dict[int, List[Dict]] = {}
+    for match in data.get("matches") or []:
+        by_season.setdefault(_match_season(match), []).append(match)
+    selected = set(by_season) if seasons is None else {int(s) for s in seasons} & set(by_season)
+    
+    previous = {}
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    shards = {}
+    if seasons is not None:
+        shards = {entry["season"]: entry for entry in previous.get("shards", [])}
+    
+    catalog = {"allTeams": teams, "allTournaments": tournaments}
+    catalog_hash = VolleyballDBConverter._content_hash(catalog)
+    if (seasons is None or previous.get("catalog_hash") != catalog_hash
+            or not (shard_path / SHARD_CATALOG).exists()):
+        _replace_db(catalog, shard_path / SHARD_CATALOG)
+    for season in sorted(selected):
+        matches = by_season[season]
+        file_name = f"season_{season}.db"
+        _replace_db({"matches": matches, "allTeams": teams, "allTournaments": tournaments},
+                    shard_path / file_name)
+        shards[season] = {
+            "season": season,
+            "file": file_name,
+            "matches": len(matches),
+            "tournaments": sorted({m["tournamentNo"] for m in matches if m.get("tournamentNo")}),
+        }
+    
+    manifest = {
+        "shard_by": "season",
+        "catalog": SHARD_CATALOG,
+        "catalog_hash": catalog_hash,
+        "shards": [shards[season] for season in sorted(shards)],
+    }
+    tmp = manifest_path.with_name(SHARD_MANIFEST + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+    print(f"Shards actualizados: {', '.join(str(s) for s in sorted(selected)) or 'ninguno'} "
+          f"({len(manifest['shards'])} en {manifest_path})")
+    return manifest
 
 
 def main():
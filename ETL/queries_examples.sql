@@ -157,3 +157,17 @@ LEFT JOIN pools p ON m.pool_no = p.no
 WHERE p.code = 'D'  -- Pool D
 ORDER BY m.match_date_utc;
 
+
+-- ============================================================
+-- 8. BUSCAR EQUIPOS Y TORNEOS POR NOMBRE (índice FTS5)
+-- ============================================================
+-- rowid = no * 2 para equipos y no * 2 + 1 para torneos
+SELECT 
+    CASE WHEN rowid % 2 = 0 THEN 'equipo' ELSE 'torneo' END AS tipo,
+    rowid / 2 AS no,
+    name,
+    code
+FROM search_index
+WHERE search_index MATCH '"colombia"'
+ORDER BY bm25(search_index)
+LIMIT 10;
@@ -1,8 +1,80 @@
 """Scrapper para obtener datos de partidos de voleibol desde la API de VolleyballWorld."""
+import argparse
 import requests
-from typing import Dict, Optional
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import date, datetime, timedelta, timezone
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+from urllib3.util.retry import Retry
 import json
 
+from database_converter import VolleyballDBConverter
+
+
+class _HostRateLimiter:
+    """Limita las requests por segundo a cada host, compartido entre hilos."""
+    
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, host: str):
+        """Bloquea hasta que haya un turno libre para el host."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ResponseCache:
+    """Caché persistente de respuestas HTTP en SQLite, con ETag/Last-Modified."""
+    
+    def __init__(self, path: str = "http_cache.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+    
+    def get(self, url: str) -> Optional[Dict]:
+        """Devuelve la entrada cacheada de una URL (body, etag, last_modified, fetched_at)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"body": row[0], "etag": row[1], "last_modified": row[2], "fetched_at": row[3]}
+    
+    def put(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]):
+        """Guarda o reemplaza la respuesta de una URL."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, time.time())
+            )
+            self._conn.commit()
+    
+    def touch(self, url: str):
+        """Marca una entrada como revalidada (respuesta 304)."""
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
 
 class VolleyballScrapper:
     """Obtiene datos de partidos desde la API de VolleyballWorld."""
@@ -10,38 +82,139 @@ class VolleyballScrapper:
     BASE_URL = "https://en.volleyballworld.com/api/v1/volley-tournament"
     COMPETITIONS_URL = "https://en.volleyballworld.com/api/v1/globalschedule/competitions"
     
-    def __init__(self):
+    # Respuestas que se reintentan con backoff exponencial
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+    
+    # Ventanas de fechas: tamaño mínimo y objetivos de tiempo de respuesta y partidos
+    MIN_WINDOW_DAYS = 1
+    WINDOW_TARGET_SECONDS = 15.0
+    WINDOW_TARGET_MATCHES = 500
+    # La API corta las respuestas en este número de partidos: una ventana que lo alcanza
+    # puede estar incompleta y se divide igual que una que falla
+    MAX_MATCHES_PER_RESPONSE = 1000
+    # Ventanas de un mismo torneo que se piden en paralelo
+    WINDOW_WORKERS = 4
+    
+    # Segundos que una respuesta cacheada se usa sin revalidar, por endpoint
+    DEFAULT_TTLS = {
+        "competitions": 24 * 3600,
+        "tournament": 10 * 60,
+        # El modo watch siempre revalida (con ETag, una respuesta sin cambios es un 304)
+        "live": 0,
+    }
+    
+    # Segundos entre consultas del modo watch
+    WATCH_INTERVAL_SECONDS = 5.0
+    
+    def __init__(self, pool_size: int = 16, max_retries: int = 4, backoff_factor: float = 0.5,
+                 requests_per_second: float = 5.0, cache_path: Optional[str] = "http_cache.db",
+                 ttls: Optional[Dict[str, float]] = None, offline: bool = False):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        self._retry = Retry(
+            total=max_retries, backoff_factor=backoff_factor, status_forcelist=self.RETRY_STATUS,
+            allowed_methods=["GET"], respect_retry_after_header=True, raise_on_status=False
+        )
+        self.pool_size = 0
+        self._pool_lock = threading.Lock()
+        self._ensure_pool_size(pool_size)
+        self.rate_limiter = _HostRateLimiter(requests_per_second)
+        self.cache = ResponseCache(cache_path) if cache_path else None
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.offline = offline
+        # Índice en memoria: año -> {número de torneo: competición}
+        self._competitions: Dict[int, Dict[int, Dict]] = {}
+        self._competitions_lock = threading.Lock()
+        # Estadísticas aprendidas de las ventanas de fechas y huecos de cobertura por torneo
+        self._window_stats: Dict[str, float] = {}
+        self._window_lock = threading.Lock()
+        self.coverage_gaps: Dict[int, List[tuple]] = {}
+    
+    def _ensure_pool_size(self, concurrency: int):
+        """Agranda el pool de conexiones HTTP para `concurrency` requests simultáneas.
+        
+        Si hay más hilos que conexiones, urllib3 abre conexiones extra y las
+        descarta al terminar ("Connection pool is full"), sin reutilizarlas.
+        """
+        with self._pool_lock:
+            if concurrency <= self.pool_size:
+                return
+            adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency,
+                                  max_retries=self._retry)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+            self.pool_size = concurrency
+    
+    def _get(self, url: str, timeout: float, headers: Optional[Dict] = None) -> requests.Response:
+        """GET con límite de requests por host; los reintentos los hace el adapter."""
+        self.rate_limiter.wait(urlparse(url).netloc)
+        return self.session.get(url, timeout=timeout, headers=headers)
+    
+    def _get_json(self, url: str, timeout: float, endpoint: str) -> Dict:
+        """GET de JSON pasando por la caché en disco.
+        
+        Si la entrada tiene menos de `ttls[endpoint]` segundos se usa sin
+        red; si no, se revalida con If-None-Match/If-Modified-Since. En modo
+        offline solo se responde desde la caché.
+        """
+        cached = self.cache.get(url) if self.cache else None
+        if cached and (self.offline or time.time() - cached["fetched_at"] < self.ttls.get(endpoint, 0)):
+            return json.loads(cached["body"])
+        if self.offline:
+            raise requests.exceptions.ConnectionError(f"Modo offline: {url} no está en la caché")
+        
+        headers = {}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+        
+        response = self._get(url, timeout=timeout, headers=headers)
+        if response.status_code == 304 and cached:
+            self.cache.touch(url)
+            return json.loads(cached["body"])
+        response.raise_for_status()
+        data = response.json()
+        if self.cache:
+            self.cache.put(url, response.content, response.headers.get("ETag"),
+                           response.headers.get("Last-Modified"))
+        return data
+    
+    def _competitions_index(self, year: int) -> Dict[int, Dict]:
+        """Índice número de torneo -> competición de un año; se descarga una vez por ejecución."""
+        with self._competitions_lock:
+            if year in self._competitions:
+                return self._competitions[year]
+        
+        url = f"{self.COMPETITIONS_URL}/{year}/"
+        data = self._get_json(url, timeout=30, endpoint="competitions")
+        index = {}
+        for competition in data.get("competitions", []):
+            for key in ("menTournaments", "womenTournaments"):
+                value = competition.get(key)
+                if value and str(value).isdigit():
+                    index[int(value)] = competition
+        with self._competitions_lock:
+            self._competitions[year] = index
+        return index
     
     def _fetch_competition_info(self, tournament_no: int, year: int) -> Optional[Dict]:
         """Obtiene información de la competición para extraer fechas exactas del torneo."""
-        url = f"{self.COMPETITIONS_URL}/{year}/"
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
             # Buscar el torneo por menTournaments o womenTournaments
-            for competition in data.get("competitions", []):
-                if (competition.get("menTournaments") == str(tournament_no) or 
-                    competition.get("womenTournaments") == str(tournament_no)):
-                    return competition
-            
-            return None
+            return self._competitions_index(year).get(tournament_no)
         except requests.exceptions.RequestException as e:
             print(f"Error obteniendo información de competición: {e}")
             return None
     
-    def _fetch_range(self, start_date: str, end_date: str, tournament_no: int) -> Optional[Dict]:
+    def _fetch_range(self, start_date: str, end_date: str, tournament_no: int,
+                     endpoint: str = "tournament") -> Optional[Dict]:
         """Obtiene datos de un rango de fechas."""
         url = f"{self.BASE_URL}/{start_date}/{end_date}/{tournament_no}"
         try:
-            response = self.session.get(url, timeout=60)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json(url, timeout=60, endpoint=endpoint)
         except requests.exceptions.RequestException as e:
             print(f"Error obteniendo datos de {start_date} a {end_date}: {e}")
             return None
@@ -84,8 +257,18 @@ class VolleyballScrapper:
         
         print(f"Obteniendo partidos del torneo {tournament_no}...")
         
-        # Intentar obtener todo el año en una sola request
-        data = self._fetch_range(start_date, end_date, tournament_no)
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        window_days = self.suggested_window_days()
+        if window_days and (end - start).days + 1 > window_days:
+            # Rango más grande que la ventana aprendida: se pide directamente en ventanas
+            data = None
+        else:
+            # Intentar obtener todo el año en una sola request
+            data = self._fetch_window(start, end, tournament_no)
+            if data and self._is_truncated(data):
+                print(f"La respuesta alcanzó el tope de {self.MAX_MATCHES_PER_RESPONSE} partidos")
+                data = None
         
         if data:
             # Consolidar datos (evitar duplicados)
@@ -99,8 +282,8 @@ class VolleyballScrapper:
                 "allTournaments": list(tournaments.values())
             }
         else:
-            print("No se pudieron obtener datos en una sola request, dividiendo el rango...")
-            # Fallback: dividir el rango en dos mitades si falla la request completa
+            print("Obteniendo el rango en ventanas...")
+            # Fallback: dividir el rango en ventanas si falla la request completa
             result = self._fetch_by_range_split(start_date, end_date, tournament_no)
         
         if output_file:
@@ -111,60 +294,275 @@ class VolleyballScrapper:
         
         return result
     
-    def _fetch_by_range_split(self, start_date: str, end_date: str, tournament_no: int) -> Dict:
-        """Divide un rango de fechas en dos mitades como fallback."""
-        from datetime import datetime, timedelta
+    def _record_window(self, days: int, seconds: float, matches: int):
+        """Aprende segundos y partidos por día a partir de una ventana exitosa."""
+        alpha = 0.3
+        with self._window_lock:
+            for key, value in (("seconds_per_day", seconds / days), ("matches_per_day", matches / days)):
+                previous = self._window_stats.get(key)
+                self._window_stats[key] = value if previous is None else previous + alpha * (value - previous)
+    
+    def suggested_window_days(self) -> Optional[int]:
+        """Tamaño de ventana (en días) aprendido de las respuestas anteriores."""
+        with self._window_lock:
+            seconds_per_day = self._window_stats.get("seconds_per_day")
+            matches_per_day = self._window_stats.get("matches_per_day")
+        if seconds_per_day is None:
+            return None
+        limits = [self.WINDOW_TARGET_SECONDS / max(seconds_per_day, 1e-6)]
+        if matches_per_day:
+            limits.append(self.WINDOW_TARGET_MATCHES / matches_per_day)
+        return max(self.MIN_WINDOW_DAYS, int(min(limits)))
+    
+    def _fetch_window(self, start: date, end: date, tournament_no: int) -> Optional[Dict]:
+        """Obtiene una ventana de fechas y registra su tiempo de respuesta y tamaño."""
+        started = time.monotonic()
+        data = self._fetch_range(start.isoformat(), end.isoformat(), tournament_no)
+        if data is not None:
+            self._record_window((end - start).days + 1, time.monotonic() - started,
+                                len(data.get("matches", [])))
+        return data
+    
+    def _is_truncated(self, data: Dict) -> bool:
+        """Indica si la respuesta alcanzó el tope de partidos de la API."""
+        return len(data.get("matches", [])) >= self.MAX_MATCHES_PER_RESPONSE
+    
+    @staticmethod
+    def _date_windows(start: date, end: date, days: int) -> List[tuple]:
+        """Parte [start, end] en ventanas consecutivas de `days` días."""
+        windows = []
+        while start <= end:
+            window_end = min(end, start + timedelta(days=days - 1))
+            windows.append((start, window_end))
+            start = window_end + timedelta(days=1)
+        return windows
+    
+    def _fetch_by_range_split(self, start_date: str, end_date: str, tournament_no: int,
+                              max_workers: int = None) -> Dict:
+        """Obtiene un rango de fechas en ventanas paralelas, bisecando las que fallan.
+        
+        Las ventanas iniciales usan el tamaño aprendido (o dos mitades si aún no
+        hay datos). Cada ventana que falla o que alcanza `MAX_MATCHES_PER_RESPONSE`
+        partidos se divide en dos hasta llegar a `MIN_WINDOW_DAYS`; las que siguen
+        fallando o cortadas se reportan en `self.coverage_gaps[tournament_no]`.
+        """
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        span_days = (end - start).days + 1
+        window_days = self.suggested_window_days() or max(self.MIN_WINDOW_DAYS, (span_days + 1) // 2)
         
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
-        mid = start + (end - start) / 2
-        mid_date = mid.strftime("%Y-%m-%d")
+        max_workers = max_workers or self.WINDOW_WORKERS
+        self._ensure_pool_size(max_workers)
+        results = []
+        gaps = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {
+                executor.submit(self._fetch_window, w_start, w_end, tournament_no): (w_start, w_end)
+                for w_start, w_end in self._date_windows(start, end, window_days)
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    w_start, w_end = pending.pop(future)
+                    data = future.result()
+                    if data is not None:
+                        # Los partidos de una ventana cortada se conservan; merge_results quita duplicados
+                        results.append(data)
+                        if not self._is_truncated(data):
+                            continue
+                    days = (w_end - w_start).days + 1
+                    if days <= self.MIN_WINDOW_DAYS:
+                        gaps.append((w_start.isoformat(), w_end.isoformat()))
+                        continue
+                    mid = w_start + timedelta(days=days // 2 - 1)
+                    reason = "fallida" if data is None else "cortada"
+                    print(f"Dividiendo la ventana {reason} {w_start} a {w_end} en dos...")
+                    for half in ((w_start, mid), (mid + timedelta(days=1), w_end)):
+                        pending[executor.submit(self._fetch_window, half[0], half[1], tournament_no)] = half
         
+        gaps.sort()
+        self.coverage_gaps[tournament_no] = gaps
+        for gap_start, gap_end in gaps:
+            print(f"ADVERTENCIA: sin datos completos del torneo {tournament_no} entre {gap_start} y {gap_end}")
+        
+        result = self.merge_results(results)
+        result["allTournaments"] = [t for t in result["allTournaments"] if t.get("no") == tournament_no]
+        return result
+    
+    @staticmethod
+    def merge_results(results: Iterable[Dict]) -> Dict:
+        """Une resultados de varios torneos eliminando duplicados."""
         matches = {}
         teams = {}
         tournaments = {}
-        
-        # Primera mitad
-        print("Obteniendo primera mitad del rango...")
-        data1 = self._fetch_range(start_date, mid_date, tournament_no)
-        if data1:
-            for m in data1.get("matches", []):
+        for result in results:
+            for m in result.get("matches", []):
                 if m.get("matchNo"):
                     matches[m["matchNo"]] = m
-            for t in data1.get("allTeams", []):
+            for t in result.get("allTeams", []):
                 if t.get("no"):
                     teams[t["no"]] = t
-            for t in data1.get("allTournaments", []):
-                if t.get("no") == tournament_no:
-                    tournaments[tournament_no] = t
-        
-        # Segunda mitad
-        print("Obteniendo segunda mitad del rango...")
-        next_date = (mid + timedelta(days=1)).strftime("%Y-%m-%d")
-        data2 = self._fetch_range(next_date, end_date, tournament_no)
-        if data2:
-            for m in data2.get("matches", []):
-                if m.get("matchNo"):
-                    matches[m["matchNo"]] = m
-            for t in data2.get("allTeams", []):
+            for t in result.get("allTournaments", []):
                 if t.get("no"):
-                    teams[t["no"]] = t
-            for t in data2.get("allTournaments", []):
-                if t.get("no") == tournament_no:
-                    tournaments[tournament_no] = t
-        
+                    tournaments[t["no"]] = t
         return {
             "matches": list(matches.values()),
             "allTeams": list(teams.values()),
             "allTournaments": list(tournaments.values())
         }
+    
+    def fetch_tournaments(self, tournament_nos: Iterable[int], year: int = None, max_workers: int = 8,
+                          output_file: Optional[str] = None) -> Dict:
+        """Obtiene varios torneos en paralelo y une sus datos.
+        
+        Cada torneo puede pedir a su vez `WINDOW_WORKERS` ventanas en paralelo,
+        así que el pool HTTP se dimensiona para el total de requests simultáneas.
+        """
+        tournament_nos = list(dict.fromkeys(tournament_nos))
+        self._ensure_pool_size(min(max_workers, max(1, len(tournament_nos))) * self.WINDOW_WORKERS)
+        results = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.fetch_full_tournament, tournament_no, year): tournament_no
+                for tournament_no in tournament_nos
+            }
+            for future in as_completed(futures):
+                tournament_no = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"Error obteniendo el torneo {tournament_no}: {e}")
+        
+        result = self.merge_results(results)
+        if output_file:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+            print(f"\nGuardado: {output_file}")
+        print(f"Torneos: {len(tournament_nos)}, Partidos: {len(result['matches'])}, Equipos: {len(result['allTeams'])}")
+        return result
+    
+    def list_season_tournaments(self, year: int) -> List[int]:
+        """Lista los números de torneo (masculinos y femeninos) de las competiciones de un año."""
+        try:
+            return list(self._competitions_index(year))
+        except requests.exceptions.RequestException as e:
+            print(f"Error obteniendo competiciones de {year}: {e}")
+            return []
+    
+    def fetch_season(self, year: int, max_workers: int = 8, output_file: Optional[str] = None) -> Dict:
+        """Obtiene en paralelo todos los torneos de una temporada."""
+        tournament_nos = self.list_season_tournaments(year)
+        print(f"Temporada {year}: {len(tournament_nos)} torneos")
+        return self.fetch_tournaments(tournament_nos, year=year, max_workers=max_workers,
+                                      output_file=output_file)
+    
+    def active_tournaments(self, day: date) -> List[int]:
+        """Torneos cuyas competiciones están en curso en `day`."""
+        try:
+            index = self._competitions_index(day.year)
+        except requests.exceptions.RequestException as e:
+            print(f"Error obteniendo competiciones de {day.year}: {e}")
+            return []
+        today = day.isoformat()
+        return [
+            tournament_no for tournament_no, competition in index.items()
+            if (competition.get("startDate") or "")[:10] <= today <= (competition.get("endDate") or "")[:10]
+        ]
+    
+    def poll_live(self, tournament_nos: Iterable[int], day: date, max_workers: int = 8) -> Dict:
+        """Obtiene la ventana de `day` de cada torneo, siempre revalidando con la API."""
+        tournament_nos = list(dict.fromkeys(tournament_nos))
+        if not tournament_nos:
+            return {"matches": [], "allTeams": [], "allTournaments": []}
+        self._ensure_pool_size(min(max_workers, len(tournament_nos)))
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tournament_nos))) as executor:
+            results = executor.map(
+                lambda tournament_no: self._fetch_range(day.isoformat(), day.isoformat(), tournament_no,
+                                                        endpoint="live") or {},
+                tournament_nos,
+            )
+            return self.merge_results(list(results))
+    
+    def watch(self, db_path: str = "volleyball_data.db", tournament_nos: Optional[Iterable[int]] = None,
+              interval: float = None, max_polls: Optional[int] = None):
+        """Modo en vivo: consulta el día actual y escribe solo los partidos que cambiaron.
+        
+        En cada vuelta pide la ventana de hoy (UTC) de los torneos dados, o de
+        los que están en curso según la API de competiciones, compara cada
+        partido, equipo y torneo con la foto anterior (hash de contenido) y
+        escribe los cambios en una transacción corta. El servidor MCP ve los
+        cambios sin reabrir la BD.
+        
+        La BD pasa a WAL para que las lecturas del servidor no bloqueen las
+        escrituras. Si una vuelta falla igual (BD bloqueada u ocupada), se
+        avisa y se reintenta en la siguiente con la foto sin cambios.
+        """
+        interval = self.WATCH_INTERVAL_SECONDS if interval is None else interval
+        converter = VolleyballDBConverter(db_path=db_path)
+        converter.enable_wal()
+        snapshot = converter.load_row_hashes()
+        fixed = list(tournament_nos) if tournament_nos else None
+        day = None
+        active: List[int] = []
+        polls = 0
+        
+        while max_polls is None or polls < max_polls:
+            started = time.monotonic()
+            today = datetime.now(timezone.utc).date()
+            if today != day:
+                day = today
+                active = fixed or self.active_tournaments(day)
+                print(f"{day}: {len(active)} torneos en curso {active}")
+            
+            data = self.poll_live(active, day)
+            try:
+                summary = converter.apply_changes(data, snapshot)
+            except sqlite3.OperationalError as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] No se pudo escribir en {db_path} ({e}); "
+                      f"se reintenta en la siguiente consulta")
+                summary = {}
+            if any(summary.values()):
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {summary['matches']} partidos, "
+                      f"{summary['teams']} equipos, {summary['tournaments']} torneos actualizados")
+            polls += 1
+            if max_polls is None or polls < max_polls:
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
 
 
 def main():
     """Ejemplo de uso."""
-    scrapper = VolleyballScrapper()
-    # El año es opcional - se puede detectar automáticamente
-    scrapper.fetch_full_tournament(tournament_no=1520, year=2025, output_file="matches.json")
+    parser = argparse.ArgumentParser(description="Obtiene partidos de VolleyballWorld")
+    parser.add_argument("--tournaments", type=int, nargs="+", default=None,
+                        help="Números de torneo (por defecto 1520; en --watch, los torneos en curso)")
+    parser.add_argument("--year", type=int, default=2025, help="Año de los torneos")
+    parser.add_argument("--season", action="store_true", help="Obtener todos los torneos del año")
+    parser.add_argument("--workers", type=int, default=8, help="Torneos en paralelo")
+    parser.add_argument("--output", default="matches.json", help="Archivo JSON de salida")
+    parser.add_argument("--offline", action="store_true", help="Usar solo respuestas de la caché HTTP")
+    parser.add_argument("--no-cache", action="store_true", help="No usar la caché HTTP en disco")
+    parser.add_argument("--watch", action="store_true",
+                        help="Modo en vivo: consultar el día actual y actualizar la BD con los cambios")
+    parser.add_argument("--interval", type=float, default=VolleyballScrapper.WATCH_INTERVAL_SECONDS,
+                        help="Segundos entre consultas del modo en vivo")
+    parser.add_argument("--db", default="volleyball_data.db", help="BD que actualiza el modo en vivo")
+    args = parser.parse_args()
+    
+    scrapper = VolleyballScrapper(cache_path=None if args.no_cache else "http_cache.db", offline=args.offline)
+    if args.tournaments is None and not args.watch:
+        args.tournaments = [1520]
+    if args.watch:
+        try:
+            scrapper.watch(db_path=args.db, tournament_nos=args.tournaments, interval=args.interval)
+        except KeyboardInterrupt:
+            print("\nModo en vivo detenido")
+    elif args.season:
+        scrapper.fetch_season(args.year, max_workers=args.workers, output_file=args.output)
+    elif len(args.tournaments) == 1:
+        # El año es opcional - se puede detectar automáticamente
+        scrapper.fetch_full_tournament(tournament_no=args.tournaments[0], year=args.year, output_file=args.output)
+    else:
+        scrapper.fetch_tournaments(args.tournaments, year=args.year, max_workers=args.workers,
+                                   output_file=args.output)
 
 
 if __name__ == "__main__":
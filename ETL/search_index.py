@@ -0,0 +1,60 @@
+"""Índice FTS5 para resolver nombres de equipos y torneos."""
+import sqlite3
+from typing import Iterable, Optional
+
+
+# El rowid del índice codifica la entidad: equipos = no * 2, torneos = no * 2 + 1
+KIND_TEAM = 0
+KIND_TOURNAMENT = 1
+
+
+def create_search_index(cursor: sqlite3.Cursor):
+    """Crea la tabla FTS5 (trigram si SQLite lo soporta, unicode61 si no)."""
+    columns = "name, alt_name, country, code"
+    try:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5({columns}, tokenize='trigram')"
+        )
+    except sqlite3.OperationalError:
+        # SQLite < 3.34 no tiene el tokenizer trigram
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            f"{columns}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+
+
+def _delete_keys(conn: sqlite3.Connection, kind: int, keys: Iterable[int]):
+    conn.executemany("DELETE FROM search_index WHERE rowid = ?",
+                     [(key * 2 + kind,) for key in keys if key is not None])
+
+
+def refresh_search_index(conn: sqlite3.Connection, teams: Optional[Iterable[int]] = None,
+                         tournaments: Optional[Iterable[int]] = None):
+    """Sincroniza el índice con las tablas teams y tournaments.
+
+    Sin argumentos lo reconstruye completo; con `teams`/`tournaments` solo
+    reemplaza esas filas. No hace commit.
+    """
+    if teams is None and tournaments is None:
+        conn.execute("DELETE FROM search_index")
+        team_filter = tournament_filter = ""
+        team_params = tournament_params = []
+    else:
+        teams = [t for t in (teams or ()) if t is not None]
+        tournaments = [t for t in (tournaments or ()) if t is not None]
+        _delete_keys(conn, KIND_TEAM, teams)
+        _delete_keys(conn, KIND_TOURNAMENT, tournaments)
+        team_filter = f"WHERE no IN ({', '.join('?' * len(teams))})" if teams else "WHERE 0"
+        tournament_filter = (f"WHERE no IN ({', '.join('?' * len(tournaments))})"
+                             if tournaments else "WHERE 0")
+        team_params, tournament_params = teams, tournaments
+
+    conn.execute(f"""
+        INSERT INTO search_index (rowid, name, alt_name, country, code)
+        SELECT no * 2 + {KIND_TEAM}, name, translated_name, country, code FROM teams {team_filter}
+    """, team_params)
+    conn.execute(f"""
+        INSERT INTO search_index (rowid, name, alt_name, country, code)
+        SELECT no * 2 + {KIND_TOURNAMENT}, name, competition_full_name, country_name, competition_short_name
+        FROM tournaments {tournament_filter}
+    """, tournament_params)
@@ -0,0 +1,167 @@
+"""Generador determinista de datos sintéticos con el formato JSON del scraper."""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+
+COUNTRIES = [
+    ("COL", "Colombia"), ("BRA", "Brazil"), ("ARG", "Argentina"), ("ITA", "Italy"), ("POL", "Poland"),
+    ("USA", "United States"), ("FRA", "France"), ("JPN", "Japan"), ("SRB", "Serbia"), ("TUR", "Türkiye"),
+    ("SLO", "Slovenia"), ("CAN", "Canada"), ("GER", "Germany"), ("NED", "Netherlands"), ("CUB", "Cuba"),
+    ("IRI", "Iran"), ("CHN", "China"), ("BUL", "Bulgaria"), ("BEL", "Belgium"), ("EGY", "Egypt"),
+    ("MEX", "Mexico"), ("PUR", "Puerto Rico"), ("DOM", "Dominican Republic"), ("KOR", "Korea"),
+]
+CITIES = ["Manila", "Bangkok", "Rotterdam", "Lodz", "Rio de Janeiro", "Chiba", "Ljubljana", "Bogotá"]
+
+
+def _tournament(no: int, season: int, gender: str) -> Dict:
+    """Torneo con los campos de `allTournaments`."""
+    start = datetime(season, 1, 1) + timedelta(days=(no * 37) % 300)
+    gender_text = "Men" if gender == "0" else "Women"
+    name = f"{gender_text}'s Synthetic Championship {season} #{no}"
+    slug = f"synthetic-{season}-{no}"
+    return {
+        "no": no, "name": name, "startDate": start.strftime("%Y-%m-%dT00:00:00"),
+        "endDate": (start + timedelta(days=20)).strftime("%Y-%m-%dT00:00:00"),
+        "discipline": "VB", "disciplineText": "Volleyball", "city": CITIES[no % len(CITIES)],
+        "country": "PHI", "countryName": "Philippines", "gender": gender, "genderText": gender_text,
+        "competitionShortName": f"SC{season}", "competitionFullName": f"Volleyball {name}",
+        "competitionSlug": slug, "logo": f"https://img.example/{slug}.png",
+        "logoSquare": f"https://img.example/{slug}-sq.png", "logoUrl": f"https://img.example/{slug}/logo",
+        "ticketsUrl": f"https://tickets.example/{slug}", "volleyBallTvLink": f"https://tv.example/{slug}",
+        "youTubeLink": f"https://youtube.example/{slug}", "storeLink": f"https://store.example/{slug}",
+        "url": f"https://www.example/{slug}", "subCompetitionType": "",
+    }
+
+
+def _teams(gender_count: int = 2) -> List[Dict]:
+    """Selecciones nacionales, una por país y género."""
+    teams = []
+    for gender in range(gender_count):
+        for i, (code, country) in enumerate(COUNTRIES):
+            no = 1000 * (gender + 1) + i
+            teams.append({
+                "no": no, "code": code, "name": country, "country": country, "translatedName": country,
+                "img": f"https://img.example/flags/{code}.png", "imgSquared": f"https://img.example/flags/{code}-sq.png",
+                "altText": f"{country} flag", "discipline": "VB", "isClub": False,
+                "tournamentCode": "M" if gender == 0 else "W",
+            })
+    return teams
+
+
+def _sets(rng: random.Random, a_wins: bool) -> Tuple[List[Dict], int, int]:
+    """Sets de un partido al mejor de 5 (los no jugados quedan en 0, como en la API)."""
+    sets_a = sets_b = 0
+    sets = []
+    for set_no in range(1, 6):
+        if sets_a == 3 or sets_b == 3:
+            sets.append({"no": set_no, "pointsTeamA": 0, "pointsTeamB": 0})
+            continue
+        target = 15 if set_no == 5 else 25
+        loser = rng.randint(target // 2, target + 3)
+        winner = max(target, loser + 2)
+        a_takes = rng.random() < (0.65 if a_wins else 0.35)
+        if (a_wins and sets_b == 2 and not a_takes) or (not a_wins and sets_a == 2 and a_takes):
+            a_takes = not a_takes
+        if a_takes:
+            sets_a += 1
+            sets.append({"no": set_no, "pointsTeamA": winner, "pointsTeamB": loser})
+        else:
+            sets_b += 1
+            sets.append({"no": set_no, "pointsTeamA": loser, "pointsTeamB": winner})
+    return sets, sets_a, sets_b
+
+
+def generate(matches: int, seasons: int = 3, tournaments_per_season: int = 4,
+             seed: int = 42) -> Iterator[tuple]:
+    """Genera (clave, valor) en el orden del scraper: partidos, equipos y torneos.
+
+    Los partidos se emiten uno a uno para no mantenerlos en memoria.
+    """
+    rng = random.Random(seed)
+    teams = _teams()
+    tournaments = []
+    for season_index in range(seasons):
+        season = 2025 - season_index
+        for t in range(tournaments_per_season):
+            tournaments.append(_tournament(1520 + season_index * 100 + t, season, "0" if t % 2 == 0 else "1"))
+
+    teams_by_gender = {
+        "0": [t for t in teams if t["tournamentCode"] == "M"],
+        "1": [t for t in teams if t["tournamentCode"] == "W"],
+    }
+    for match_no in range(1, matches + 1):
+        tournament = tournaments[match_no % len(tournaments)]
+        season = int(tournament["startDate"][:4])
+        team_a, team_b = rng.sample(teams_by_gender[tournament["gender"]], 2)
+        a_wins = rng.random() < 0.5
+        sets, score_a, score_b = _sets(rng, a_wins)
+        start = datetime.fromisoformat(tournament["startDate"])
+        played = start + timedelta(days=rng.randint(0, 20), hours=rng.choice([12, 15, 18, 21]))
+        pool_index = rng.randint(0, 7)
+        round_index = rng.randint(0, 3)
+        slug = tournament["competitionSlug"]
+        yield "matches", {
+            "matchNo": match_no, "matchNoInTournament": match_no // len(tournaments) + 1,
+            "tournamentNo": tournament["no"], "teamANo": team_a["no"], "teamBNo": team_b["no"],
+            "winnerTeamNo": team_a["no"] if score_a > score_b else team_b["no"],
+            "teamAScore": score_a, "teamBScore": score_b,
+            "matchDateUtc": played.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "matchDateTimeLocal": (played + timedelta(hours=8)).strftime("%Y-%m-%dT%H:%M:%S"),
+            "matchStatus": 2, "currentSetNo": score_a + score_b,
+            "competitionSlug": slug, "competitionShortName": tournament["competitionShortName"],
+            "competitionFullName": tournament["competitionFullName"],
+            "roundNo": tournament["no"] * 10 + round_index, "roundName": f"Round {round_index + 1}",
+            "roundCode": f"R{round_index + 1}",
+            "pool": {"no": tournament["no"] * 10 + pool_index, "name": f"Pool {'ABCDEFGH'[pool_index]}",
+                     "code": "ABCDEFGH"[pool_index]},
+            "city": tournament["city"], "countryCode": "PHI", "country": "Philippines",
+            "gender": tournament["gender"], "genderText": tournament["genderText"],
+            "discipline": "VB", "disciplineText": "Volleyball", "pinnedCompetition": False,
+            "isMatchTBD": False, "tournamentType": 1, "season": season,
+            "ticketLink": f"https://tickets.example/{slug}", "volleyBallTvLink": f"https://tv.example/{slug}",
+            "youTubeLink": f"https://youtube.example/{slug}",
+            "matchCenterUrl": f"https://www.example/{slug}/match/{match_no}",
+            "worldRankingUrl": "https://www.example/world-ranking",
+            "teamAReplacementTBD": "", "teamBReplacementTBD": "", "phase": "Pool",
+            "court": f"C{match_no % 3 + 1}", "courtText": f"Court {match_no % 3 + 1}",
+            "sets": sets,
+        }
+    yield "allTeams", teams
+    yield "allTournaments", tournaments
+
+
+def write_dataset(path: str, matches: int, seasons: int = 3, tournaments_per_season: int = 4,
+                  seed: int = 42):
+    """Escribe el dataset en `path` en streaming."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"matches": [')
+        first = True
+        for key, value in generate(matches, seasons, tournaments_per_season, seed):
+            if key == "matches":
+                if not first:
+                    f.write(",")
+                f.write(json.dumps(value, ensure_ascii=False))
+                first = False
+            else:
+                f.write(f'], "{key}": ' if key == "allTeams" else f', "{key}": ')
+                f.write(json.dumps(value, ensure_ascii=False))
+        f.write("}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético de voleibol")
+    parser.add_argument("--matches", type=int, default=100_000, help="Cantidad de partidos")
+    parser.add_argument("--seasons", type=int, default=3, help="Temporadas")
+    parser.add_argument("--tournaments-per-season", type=int, default=4, help="Torneos por temporada")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla")
+    parser.add_argument("--output", default="synthetic_matches.json", help="Archivo JSON de salida")
+    args = parser.parse_args()
+    write_dataset(args.output, args.matches, args.seasons, args.tournaments_per_season, args.seed)
+    print(f"Generados {args.matches} partidos en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
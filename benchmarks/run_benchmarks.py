@@ -0,0 +1,205 @@
+"""Benchmarks del ETL, de run_query y de las herramientas MCP sobre datos sintéticos.
+
+Uso:
+    python benchmarks/run_benchmarks.py --matches 100000 --output bench_results.json
+
+Los resultados se escriben en JSON para comparar ejecuciones.
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import platform
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "ETL"))
+
+from generate_dataset import write_dataset  # noqa: E402
+from database_converter import VolleyballDBConverter  # noqa: E402
+import db_connection  # noqa: E402
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    """Resumen de una distribución de latencias en milisegundos."""
+    ordered = sorted(samples)
+
+    def _at(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "p50_ms": round(_at(0.50) * 1000, 4),
+        "p90_ms": round(_at(0.90) * 1000, 4),
+        "p99_ms": round(_at(0.99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+def load_workload(path: Path = ROOT / "ETL" / "queries_examples.sql") -> List[Dict[str, str]]:
+    """Lee las queries de ejemplo, nombradas por su encabezado de sección."""
+    queries = []
+    section = "query"
+    for statement in path.read_text(encoding="utf-8").split(";"):
+        headers = re.findall(r"--\s*(\d+\.\s*[^\n]+)", statement)
+        if headers:
+            section = headers[-1].strip()
+        sql = re.sub(r"--[^\n]*", "", statement).strip()
+        if sql:
+            name = section if not any(q["name"] == section for q in queries) else f"{section} (alt)"
+            queries.append({"name": name, "sql": sql})
+    return queries
+
+
+def bench_etl(json_file: Path, workdir: Path) -> Dict:
+    """Tiempo y filas/s de cada etapa insert_* del ETL (bulk y streaming)."""
+    results = {}
+    for mode in ("bulk", "stream"):
+        db_path = workdir / f"etl_{mode}.db"
+        converter = VolleyballDBConverter(db_path=str(db_path))
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if mode == "bulk":
+                converter.convert_json_to_db(str(json_file), recreate=True)
+            else:
+                converter.stream_json_to_db(str(json_file), recreate=True)
+        results[mode] = {
+            "total_seconds": round(time.perf_counter() - start, 4),
+            "stages": converter.load_stats,
+            "db_bytes": db_path.stat().st_size,
+        }
+    return results
+
+
+def bench_queries(db_path: Path, iterations: int) -> Dict:
+    """Distribución de latencias de run_query sobre el workload de ejemplo."""
+    db_connection.configure_database(db_path)
+    results = {}
+    for query in load_workload():
+        entry = {}
+        for label, use_cache in (("uncached", False), ("cached", True)):
+            samples = []
+            try:
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    rows = db_connection.run_query(query["sql"], use_cache=use_cache, timeout=60)
+                    samples.append(time.perf_counter() - start)
+                entry[label] = _percentiles(samples)
+                entry["rows"] = len(rows)
+            except Exception as e:
+                entry[label] = {"error": f"{type(e).__name__}: {e}"}
+        results[query["name"]] = entry
+    results["_cache"] = db_connection.get_query_cache().stats()
+    results["_pool"] = db_connection.get_pool().stats()
+    return results
+
+
+async def _bench_tools(iterations: int) -> Dict:
+    from mcp.shared.memory import create_connected_server_and_client_session
+    import main
+
+    calls = [
+        ("execute_query", {"query": "SELECT COUNT(*) FROM matches"}),
+        ("team_record", {"team_code": "COL"}),
+        ("head_to_head", {"team_code": "COL", "opponent_code": "BRA"}),
+        ("matches_by_team", {"team_code": "COL", "date_from": "2025-01-01", "date_to": "2025-12-31"}),
+        ("search_entities", {"text": "colombia"}),
+    ]
+    results = {}
+    cache = db_connection.get_query_cache()
+    async with create_connected_server_and_client_session(main.mcp._mcp_server) as client:
+        for tool, arguments in calls:
+            entry = {}
+            # Igual que bench_queries: sin caché (se vacía antes de cada llamada) y con caché
+            for label, clear_cache in (("uncached", True), ("cached", False)):
+                samples = []
+                for _ in range(iterations):
+                    if clear_cache:
+                        cache.clear()
+                    start = time.perf_counter()
+                    result = await client.call_tool(tool, arguments)
+                    samples.append(time.perf_counter() - start)
+                    if result.isError:
+                        # Un error rápido no es una latencia válida
+                        text = " ".join(getattr(c, "text", "") for c in result.content)
+                        entry[label] = {"error": text}
+                        break
+                else:
+                    entry[label] = _percentiles(samples)
+            results[tool] = entry
+            if any("error" in stats for stats in entry.values()):
+                print(f"  {tool}: error ({entry})", file=sys.stderr)
+    return results
+
+
+def bench_tools(db_path: Path, iterations: int) -> Dict:
+    """Round-trip de herramientas a través de un cliente MCP en proceso.
+
+    Se omite solo si el paquete `mcp` no está instalado; un error al importar
+    `main` hace fallar el benchmark.
+    """
+    if importlib.util.find_spec("mcp") is None:
+        return {"skipped": "mcp no disponible"}
+    db_connection.configure_database(db_path)
+    return asyncio.run(_bench_tools(iterations))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del servidor MCP de voleibol")
+    parser.add_argument("--matches", type=int, default=100_000, help="Partidos del dataset sintético")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador")
+    parser.add_argument("--iterations", type=int, default=20, help="Repeticiones por query/herramienta")
+    parser.add_argument("--workdir", default=None, help="Directorio para el dataset y las BDs")
+    parser.add_argument("--output", default="bench_results.json", help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="volleyball_bench_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    json_file = workdir / "synthetic_matches.json"
+
+    start = time.perf_counter()
+    write_dataset(str(json_file), args.matches, seed=args.seed)
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "matches": args.matches,
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "json_bytes": json_file.stat().st_size,
+            "generate_seconds": round(time.perf_counter() - start, 4),
+        }
+    }
+    print(f"Dataset: {args.matches} partidos ({results['meta']['json_bytes']} bytes)")
+
+    results["etl"] = bench_etl(json_file, workdir)
+    print("ETL: " + ", ".join(f"{mode} {r['total_seconds']}s" for mode, r in results["etl"].items()))
+
+    db_path = workdir / "etl_bulk.db"
+    results["queries"] = bench_queries(db_path, args.iterations)
+    print(f"Queries: {len(results['queries']) - 2} del workload de ejemplo")
+
+    results["tools"] = bench_tools(db_path, args.iterations)
+    print(f"Herramientas: {', '.join(results['tools'])}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Resultados: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,82 @@
+import json
+import os
+import re
+import secrets
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from query_guard import check_query, explain_query_plan
+from query_stats import get_query_stats
+
+
+# Ajustes de las conexiones de solo lectura del pool
+POOL_MAX_SIZE = 8
+CACHE_SIZE_KIB = 64 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+# Sentencias preparadas que cada conexión del pool mantiene en caché
+CACHED_STATEMENTS = 256
+
+# Límite de memoria de la caché de resultados
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Instrucciones de la VM de SQLite entre cada revisión de timeout/cancelación
+PROGRESS_HANDLER_STEPS = 1000
+
+# Paginación de resultados
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+CURSOR_IDLE_SECONDS = 120.0
+# Cada cuánto un hilo en segundo plano cierra los cursores inactivos
+CURSOR_REAP_SECONDS = 5.0
+MAX_OPEN_CURSORS = 32
+
+# BD particionada por temporada (ETL/database_converter.py: shard_json_to_db)
+SHARD_MANIFEST = "manifest.json"
+# Tablas con filas repartidas entre shards: se unen con UNION ALL
+SHARDED_TABLES = ("matches", "sets", "pools", "rounds", "team_season_records")
+# Agregados que un par de equipos o un pool puede tener en varios shards:
+# (columnas de agrupación, columnas que se toman con MAX); el resto se suma
+SHARDED_AGGREGATES = {
+    "head_to_head": (("team_no", "opponent_no"), ()),
+    "pool_standings": (("pool_no", "team_no"), ("tournament_no",)),
+}
+# Hilos para ejecutar una query en todos los shards a la vez (SQLite libera el GIL)
+FAN_OUT_WORKERS = min(8, os.cpu_count() or 1)
+# Pools de subconjuntos de temporadas que se mantienen abiertos (ver ShardedConnectionPool.scoped)
+MAX_SCOPED_POOLS = 16
+
+# Bloques con los que warm_up lee los archivos de la BD
+WARMUP_CHUNK_BYTES = 1024 * 1024
+
+
+class QueryCancelledError(Exception):
+    """La query fue cancelada por el cliente antes de terminar."""
+
+
+# Ruta configurada explícitamente con configure_database (None = ruta por defecto)
+_db_path_override: Optional[Path] = None
 
 
 def _get_db_path() -> Path:
     """Obtiene la ruta de la base de datos."""
+    if _db_path_override is not None:
+        return _db_path_override
+    
     # Intentar usar __file__ primero
     try:
         db_path = Path(__file__).resolve().parent / "ETL" / "volleyball_data.db"
         if db_path.exists():
             return db_path
+        # Si no hay BD única, usar la BD particionada por temporada
+        manifest_path = db_path.parent / "shards" / SHARD_MANIFEST
+        if manifest_path.exists():
+            return manifest_path
     except (NameError, AttributeError):
         pass
     
@@ -22,23 +89,1062 @@ def get_connection() -> sqlite3.Connection:
     db_path = _get_db_path()
     return sqlite3.connect(str(db_path))
 
-def run_query(sql: str, params: Tuple[Any, ...] = ()) -> List[Tuple]:
+
+class ConnectionPool:
+    """Pool de conexiones de solo lectura que se mantienen abiertas entre llamadas.
+
+    Cada conexión la usa un solo hilo a la vez (se presta con `acquire` y se
+    devuelve con `release`). Si el ETL reemplaza el archivo de la base de datos
+    (nuevo inode), las conexiones abiertas se descartan y se reabren contra el
+    archivo nuevo.
+    """
+
+    def __init__(self, db_path: Path, max_size: int = POOL_MAX_SIZE,
+                 cache_size_kib: int = CACHE_SIZE_KIB, mmap_size: int = MMAP_SIZE):
+        self.db_path = Path(db_path)
+        self.max_size = max_size
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self._idle: List[Tuple[sqlite3.Connection, int]] = []
+        self._lock = threading.Lock()
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._generation = 0
+        self.opened = 0
+        self.reused = 0
+
+    def _current_file_id(self) -> Tuple[int, int]:
+        """Identifica el archivo actual de la BD por (device, inode)."""
+        try:
+            st = os.stat(self.db_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"No existe la base de datos {self.db_path}. Ejecuta el ETL primero."
+            ) from None
+        return (st.st_dev, st.st_ino)
+
+    def _open(self) -> sqlite3.Connection:
+        """Abre una conexión de solo lectura con los PRAGMAs de lectura."""
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        self.opened += 1
+        return conn
+
+    def _check_file(self):
+        """Invalida las conexiones si el archivo de la BD fue reemplazado. Requiere el lock."""
+        file_id = self._current_file_id()
+        if file_id != self._file_id:
+            for conn, _ in self._idle:
+                conn.close()
+            self._idle.clear()
+            self._file_id = file_id
+            self._generation += 1
+
+    def acquire(self) -> Tuple[sqlite3.Connection, int]:
+        """Presta una conexión del pool (o abre una nueva) junto con su generación."""
+        with self._lock:
+            self._check_file()
+            generation = self._generation
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+        return self._open(), generation
+
+    def release(self, conn: sqlite3.Connection, generation: int):
+        """Devuelve una conexión al pool o la cierra si ya no es válida."""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if generation == self._generation and len(self._idle) < self.max_size:
+                self._idle.append((conn, generation))
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Context manager que presta una conexión y la devuelve al terminar."""
+        conn, generation = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn, generation)
+
+    def close(self):
+        """Cierra todas las conexiones inactivas del pool."""
+        with self._lock:
+            for conn, _ in self._idle:
+                conn.close()
+            self._idle.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        """Estadísticas del pool."""
+        with self._lock:
+            return {
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                "opened": self.opened,
+                "reused": self.reused,
+                "generation": self._generation,
+            }
+
+
+def _is_manifest(path: Path) -> bool:
+    """True si la ruta apunta al manifiesto de una BD particionada."""
+    return Path(path).suffix == ".json"
+
+
+_manifests: Dict[Path, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+
+def read_manifest(path: Path) -> Dict[str, Any]:
+    """Lee el manifiesto de shards, reutilizándolo mientras el archivo no cambie."""
+    path = Path(path)
+    st = os.stat(path)
+    version = (st.st_ino, st.st_mtime_ns)
+    cached = _manifests.get(path)
+    if cached is None or cached[0] != version:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = _manifests[path] = (version, json.load(f))
+    return cached[1]
+
+
+def _db_files(path: Path) -> List[Path]:
+    """Archivos que componen la BD: el archivo único, o el manifiesto con el catálogo y los shards."""
+    path = Path(path)
+    if not _is_manifest(path):
+        return [path]
+    manifest = read_manifest(path)
+    return [path, path.parent / manifest["catalog"]] + [path.parent / s["file"] for s in manifest["shards"]]
+
+
+_attach_limit: Optional[int] = None
+
+
+def attach_limit() -> int:
+    """Máximo de BDs que SQLite permite adjuntar a una conexión (SQLITE_LIMIT_ATTACHED)."""
+    global _attach_limit
+    if _attach_limit is None:
+        conn = sqlite3.connect(":memory:")
+        try:
+            _attach_limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        finally:
+            conn.close()
+    return _attach_limit
+
+
+class ShardedConnectionPool(ConnectionPool):
+    """Pool sobre una BD particionada por temporada.
+
+    Cada conexión abre el catálogo (equipos, torneos e índice de búsqueda) y
+    adjunta los shards con ATTACH. Vistas temporales con los nombres de las
+    tablas originales unen los shards, así que las queries y herramientas
+    existentes funcionan sin cambios. Reconstruir un shard o el manifiesto
+    cambia la identidad de los archivos y las conexiones se reabren.
+
+    SQLite adjunta como máximo `attach_limit()` BDs por conexión. `scoped`
+    devuelve pools cuyas conexiones solo adjuntan algunas temporadas; con más
+    shards que ese límite, las queries sobre todas las temporadas se hacen por
+    grupos (`shard_batches`) o por shard.
+
+    Para `run_query_per_shard`, cada shard tiene además su propio pool: un
+    shard es una BD completa (con equipos y torneos), así que una query se
+    puede ejecutar en él directamente, con sus índices y estadísticas.
+    """
+
+    def __init__(self, db_path: Path, seasons: Optional[Iterable[int]] = None, **kwargs):
+        super().__init__(db_path, **kwargs)
+        # Temporadas que adjuntan las conexiones (None = todas las del manifiesto)
+        self.seasons = None if seasons is None else tuple(sorted({int(s) for s in seasons}))
+        self._shard_pools: Dict[Path, ConnectionPool] = {}
+        self._scoped_pools: "OrderedDict[Tuple[int, ...], ShardedConnectionPool]" = OrderedDict()
+
+    def _scope_shards(self, manifest: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Entradas del manifiesto que adjuntan las conexiones de este pool."""
+        if self.seasons is None:
+            return manifest["shards"]
+        wanted = set(self.seasons)
+        return [shard for shard in manifest["shards"] if shard["season"] in wanted]
+
+    def all_seasons(self) -> List[int]:
+        """Temporadas del manifiesto."""
+        return [shard["season"] for shard in read_manifest(self.db_path)["shards"]]
+
+    def shard_batches(self) -> Optional[List[Tuple[int, ...]]]:
+        """Grupos de temporadas que caben en una conexión, o None si caben todas juntas."""
+        seasons = self.all_seasons()
+        limit = attach_limit()
+        if len(seasons) <= limit:
+            return None
+        return [tuple(seasons[i:i + limit]) for i in range(0, len(seasons), limit)]
+
+    def scoped(self, seasons: Iterable[int]) -> "ShardedConnectionPool":
+        """Pool cuyas conexiones solo adjuntan los shards de `seasons` (vacío = solo el catálogo).
+
+        Raises:
+            ValueError: Si alguna temporada no tiene shard.
+        """
+        key = tuple(sorted({int(season) for season in seasons}))
+        missing = set(key) - set(self.all_seasons())
+        if missing:
+            raise ValueError(f"No hay shards de las temporadas {sorted(missing)}.")
+        evicted = []
+        with self._lock:
+            pool = self._scoped_pools.get(key)
+            if pool is None:
+                pool = self._scoped_pools[key] = ShardedConnectionPool(
+                    self.db_path, key, max_size=self.max_size,
+                    cache_size_kib=self.cache_size_kib, mmap_size=self.mmap_size,
+                )
+                while len(self._scoped_pools) > MAX_SCOPED_POOLS:
+                    evicted.append(self._scoped_pools.popitem(last=False)[1])
+            else:
+                self._scoped_pools.move_to_end(key)
+        for old in evicted:
+            old.close()
+        return pool
+
+    def shard_pools(self, seasons: Optional[Iterable[int]] = None) -> List[Tuple[int, ConnectionPool]]:
+        """Pools de los shards del manifiesto (todos, o los de `seasons`)."""
+        manifest = read_manifest(self.db_path)
+        wanted = None if seasons is None else {int(season) for season in seasons}
+        result = []
+        with self._lock:
+            for shard in manifest["shards"]:
+                if wanted is not None and shard["season"] not in wanted:
+                    continue
+                path = (self.db_path.parent / shard["file"]).resolve()
+                pool = self._shard_pools.get(path)
+                if pool is None:
+                    pool = self._shard_pools[path] = ConnectionPool(
+                        path, self.max_size, self.cache_size_kib, self.mmap_size
+                    )
+                result.append((shard["season"], pool))
+        return result
+
+    def close(self):
+        super().close()
+        with self._lock:
+            pools = list(self._shard_pools.values()) + list(self._scoped_pools.values())
+            self._scoped_pools.clear()
+        for pool in pools:
+            pool.close()
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._lock:
+            stats["scoped_pools"] = len(self._scoped_pools)
+        return stats
+
+    def _current_file_id(self) -> Tuple:
+        try:
+            return tuple((st.st_dev, st.st_ino) for st in map(os.stat, _db_files(self.db_path)))
+        except FileNotFoundError as e:
+            raise FileNotFoundError(
+                f"Falta un archivo de la BD particionada ({e.filename}). Ejecuta el ETL primero."
+            ) from None
+
+    def _open(self) -> sqlite3.Connection:
+        manifest = read_manifest(self.db_path)
+        base = self.db_path.parent
+        shards = self._scope_shards(manifest)
+        limit = attach_limit()
+        if len(shards) > limit:
+            raise ValueError(
+                f"La query abarca {len(shards)} shards de temporada y SQLite adjunta como máximo "
+                f"{limit} por conexión. Limítala con `seasons` (hasta {limit} temporadas) "
+                "o usa `per_season=True`."
+            )
+        uri = f"{(base / manifest['catalog']).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+        try:
+            schemas = []
+            for shard in shards:
+                schema = f"shard_{shard['season']}"
+                conn.execute(f"ATTACH DATABASE ? AS {schema}",
+                             (f"{(base / shard['file']).resolve().as_uri()}?mode=ro",))
+                schemas.append(schema)
+            for schema in ["main"] + schemas:
+                conn.execute(f"PRAGMA {schema}.cache_size = {-int(self.cache_size_kib)}")
+                conn.execute(f"PRAGMA {schema}.mmap_size = {int(self.mmap_size)}")
+            if schemas:
+                self._create_views(conn, schemas)
+            conn.execute("PRAGMA query_only = ON")
+        except BaseException:
+            conn.close()
+            raise
+        self.opened += 1
+        return conn
+
+    @staticmethod
+    def _create_views(conn: sqlite3.Connection, schemas: List[str]):
+        """Crea las vistas temporales que unen las tablas de todos los shards."""
+        for table in SHARDED_TABLES:
+            union = " UNION ALL ".join(f"SELECT * FROM {schema}.{table}" for schema in schemas)
+            conn.execute(f"CREATE TEMP VIEW {table} AS {union}")
+        for table, (keys, max_columns) in SHARDED_AGGREGATES.items():
+            columns = [row[1] for row in conn.execute(f"PRAGMA {schemas[0]}.table_info({table})")]
+            select = ", ".join(
+                column if column in keys
+                else f"MAX({column}) AS {column}" if column in max_columns
+                else f"SUM({column}) AS {column}"
+                for column in columns
+            )
+            union = " UNION ALL ".join(f"SELECT * FROM {schema}.{table}" for schema in schemas)
+            conn.execute(
+                f"CREATE TEMP VIEW {table} AS SELECT {select} FROM ({union}) GROUP BY {', '.join(keys)}"
+            )
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.RLock()
+
+
+def get_pool() -> ConnectionPool:
+    """Obtiene el pool de conexiones compartido del proceso.
+
+    El pool se crea con la primera ruta que existe: mientras la BD no exista
+    (por ejemplo antes de correr el ETL), la ruta se vuelve a resolver en cada
+    llamada y se lanza FileNotFoundError.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                db_path = _get_db_path()
+                if not db_path.exists():
+                    raise FileNotFoundError(
+                        f"No existe la base de datos {db_path}. Ejecuta el ETL primero."
+                    )
+                pool_class = ShardedConnectionPool if _is_manifest(db_path) else ConnectionPool
+                _pool = pool_class(db_path)
+    return _pool
+
+
+def _scoped_pool(seasons: Optional[Iterable[int]]) -> ConnectionPool:
+    """Pool del proceso, restringido a `seasons` si la BD está particionada."""
+    pool = get_pool()
+    if seasons is None or not isinstance(pool, ShardedConnectionPool):
+        return pool
+    return pool.scoped(seasons)
+
+
+def shard_batches() -> Optional[List[Tuple[int, ...]]]:
+    """Grupos de temporadas para consultar todas por partes.
+
+    None si la BD no está particionada o si todos sus shards caben en una
+    conexión (ver `attach_limit`).
+    """
+    pool = get_pool()
+    if not isinstance(pool, ShardedConnectionPool):
+        return None
+    return pool.shard_batches()
+
+
+_LITERAL_RE = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+
+def normalize_sql(sql: str) -> str:
+    """Normaliza espacios y mayúsculas de una query sin tocar los literales."""
+    parts = _LITERAL_RE.split(sql.strip().rstrip(";"))
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            normalized.append(part)
+        else:
+            normalized.append(" ".join(part.lower().split()))
+    return "".join(normalized).strip()
+
+
+def _estimate_size(rows: List[Tuple]) -> int:
+    """Estima el tamaño en bytes de un resultado."""
+    size = 56
+    for row in rows:
+        size += 56 + 8 * len(row)
+        for value in row:
+            if isinstance(value, (str, bytes)):
+                size += len(value) + 49
+            else:
+                size += 24
+    return size
+
+
+class QueryCache:
+    """Caché LRU de resultados limitada por bytes.
+
+    Las entradas se invalidan cuando cambia el archivo de la base de datos
+    (inode, mtime o tamaño, incluido el WAL), por ejemplo después de que
+    `VolleyballDBConverter.convert_json_to_db` la reconstruye, y cuando otra
+    conexión hace commit sobre el mismo archivo (`PRAGMA data_version`), como
+    las transacciones cortas del modo en vivo del scraper.
+    """
+
+    def __init__(self, db_path: Path, max_bytes: int = CACHE_MAX_BYTES):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[List[Tuple], int, List[str], List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple] = None
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+        self._version_conn: Optional[sqlite3.Connection] = None
+        self._version_file: Optional[Tuple] = None
+
+    def _data_version(self, file_id: Optional[Tuple]) -> Optional[int]:
+        """`PRAGMA data_version` de una conexión propia; cambia con cada commit de otra conexión.
+
+        La conexión se reabre si el archivo fue reemplazado. Requiere el lock.
+        """
+        if file_id is None or _is_manifest(self.db_path):
+            return None
+        if self._version_conn is None or self._version_file != file_id:
+            if self._version_conn is not None:
+                self._version_conn.close()
+            uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+            self._version_conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._version_file = file_id
+        try:
+            return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+    def _db_signature(self) -> Tuple:
+        """Firma del estado de la BD en disco."""
+        signature = []
+        paths = []
+        for db_file in _db_files(self.db_path):
+            paths += [db_file, Path(f"{db_file}-wal")]
+        for path in paths:
+            try:
+                st = os.stat(path)
+                signature.append((st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        signature.append(self._data_version(signature[0][:2] if signature[0] else None))
+        return tuple(signature)
+
+    def _check_signature(self):
+        """Vacía la caché si la BD cambió. Requiere el lock."""
+        signature = self._db_signature()
+        if signature != self._signature:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.current_bytes = 0
+            self._signature = signature
+
+    def signature(self) -> Optional[Tuple]:
+        """Firma actual de la BD.
+
+        Se toma al fallar `get`, antes de ejecutar la query, y se pasa a `put`:
+        si la BD cambió mientras tanto, el resultado puede ser anterior al
+        commit y no se guarda.
+        """
+        with self._lock:
+            self._check_signature()
+            return self._signature
+
+    @staticmethod
+    def make_key(sql: str, params: Tuple[Any, ...] = ()) -> Tuple:
+        """Clave de caché: SQL normalizado más parámetros."""
+        return (normalize_sql(sql), tuple(params))
+
+    def get(self, key: Tuple, with_columns: bool = False, warnings: Optional[List[str]] = None):
+        """Devuelve el resultado cacheado (o `(columnas, filas)`) o None.
+
+        Si se pasa `warnings`, se le agregan las advertencias del cost guard
+        guardadas con el resultado.
+        """
+        with self._lock:
+            self._check_signature()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if warnings is not None:
+                warnings.extend(entry[3])
+            if with_columns:
+                return list(entry[2]), list(entry[0])
+            return list(entry[0])
+
+    def put(self, key: Tuple, rows: List[Tuple], columns: Sequence[str] = (),
+            warnings: Sequence[str] = (), signature: Optional[Tuple] = None):
+        """Guarda un resultado (con sus advertencias), expulsando las entradas menos usadas si hace falta.
+
+        `signature` es la de `signature()` antes de ejecutar la query; si la BD
+        cambió desde entonces, el resultado se descarta.
+        """
+        size = _estimate_size(rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._check_signature()
+            if signature is not None and signature != self._signature:
+                self.stale_puts += 1
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (list(rows), size, list(columns), list(warnings))
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted, _, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted
+
+    def clear(self):
+        """Vacía la caché."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        """Contadores de la caché."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+            }
+
+
+_cache: Optional[QueryCache] = None
+
+
+def get_query_cache() -> QueryCache:
+    """Obtiene la caché de resultados compartida del proceso."""
+    global _cache
+    if _cache is None:
+        with _pool_lock:
+            if _cache is None:
+                # Misma ruta que el pool, para no fijar una ruta que todavía no existe
+                _cache = QueryCache(get_pool().db_path)
+    return _cache
+
+
+@contextmanager
+def _query_guard(conn: sqlite3.Connection, timeout: Optional[float],
+                 cancel_event: Optional[threading.Event]):
+    """Aborta la sentencia en curso si vence el timeout o se cancela la query.
+
+    Usa el progress handler de SQLite: cuando devuelve un valor distinto de
+    cero, SQLite interrumpe la sentencia con `OperationalError: interrupted`.
+    """
+    if timeout is None and cancel_event is None:
+        yield
+        return
+    
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    state = {"reason": None}
+    
+    def _progress() -> int:
+        if cancel_event is not None and cancel_event.is_set():
+            state["reason"] = "cancelled"
+            return 1
+        if deadline is not None and time.monotonic() > deadline:
+            state["reason"] = "timeout"
+            return 1
+        return 0
+    
+    conn.set_progress_handler(_progress, PROGRESS_HANDLER_STEPS)
+    try:
+        yield
+    except sqlite3.OperationalError:
+        if state["reason"] == "timeout":
+            raise TimeoutError(
+                f"La query superó el tiempo límite de {timeout} s y fue cancelada. "
+                "Intenta filtrar por columnas indexadas o agregar un LIMIT."
+            ) from None
+        if state["reason"] == "cancelled":
+            raise QueryCancelledError("La query fue cancelada por el cliente.") from None
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+_LEADING_COMMENT_RE = re.compile(r"^\s*(?:--[^\n]*(?:\n|$)|/\*.*?\*/)", re.DOTALL)
+
+
+def _validate_select(sql: str):
+    """Verifica que la query sea de solo lectura (SELECT o WITH ... SELECT)."""
+    stripped = sql
+    while True:
+        match = _LEADING_COMMENT_RE.match(stripped)
+        if not match:
+            break
+        stripped = stripped[match.end():]
+    if not stripped.strip().lower().startswith(("select", "with")):
+        raise ValueError("Solo se permiten queries SELECT. Intenta con una query SELECT.")
+
+
+def run_query(sql: str, params: Tuple[Any, ...] = (), use_cache: bool = True,
+              timeout: Optional[float] = None,
+              cancel_event: Optional[threading.Event] = None,
+              check_cost: bool = True, with_columns: bool = False,
+              seasons: Optional[Iterable[int]] = None, warnings: Optional[List[str]] = None):
     """Ejecuta una query SELECT y devuelve los resultados.
     
     Args:
         sql: La query SQL a ejecutar.
         params: Los parámetros para la query.
+        use_cache: Si se usa la caché de resultados.
+        timeout: Tiempo máximo de ejecución en segundos (None = sin límite).
+        cancel_event: Evento que, al activarse, interrumpe la query en curso.
+        check_cost: Si se valida el plan antes de ejecutar; las queries fijas
+            de las herramientas tipadas lo omiten.
+        with_columns: Si se devuelven también los nombres de las columnas.
+        seasons: En una BD particionada, las temporadas cuyos shards se adjuntan
+            (las vistas solo ven esas; vacío = solo el catálogo). Se ignora en
+            una BD de un solo archivo.
+        warnings: Lista a la que se agregan las advertencias del cost guard
+            (scans completos), también si el resultado sale de la caché.
 
     Returns:
-        Una lista de tuplas con los resultados de la query.
+        Una lista de tuplas con los resultados de la query, o `(columnas, filas)`
+        si `with_columns` es True.
     """
-    if not sql.strip().lower().startswith("select"):
-        raise ValueError("Solo se permiten queries SELECT. Intenta con una query SELECT.")
+    _validate_select(sql)
+    
+    start = time.perf_counter()
+    pool = _scoped_pool(seasons)
+    cache = get_query_cache() if use_cache else None
+    key = cache.make_key(sql, params) if cache is not None else (normalize_sql(sql), params)
+    if getattr(pool, "seasons", None) is not None:
+        key += (("seasons", pool.seasons),)
+    if cache is not None:
+        cached = cache.get(key, with_columns=True, warnings=warnings)
+        if cached is not None:
+            columns, rows = cached
+            get_query_stats().record_query(key[0], time.perf_counter() - start, len(rows), cached=True)
+            return (columns, rows) if with_columns else rows
+        signature = cache.signature()
     
-    conn = get_connection()
+    columns: List[str] = []
+    rows = []
+    query_warnings: List[str] = []
+    error = None
     try:
-        cur = conn.cursor()
-        cur.execute(sql, params)
-        return cur.fetchall()
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                with _query_guard(conn, timeout, cancel_event):
+                    if check_cost:
+                        sql_to_run, report = check_query(conn, sql, params)
+                        query_warnings = report["warnings"]
+                    else:
+                        sql_to_run = sql
+                    cur.execute(sql_to_run, params)
+                    rows = cur.fetchall()
+                    columns = [d[0] for d in cur.description or ()]
+            finally:
+                cur.close()
+    except Exception as e:
+        error = e
+        raise
     finally:
-        conn.close()
+        get_query_stats().record_query(key[0], time.perf_counter() - start, len(rows), cached=False,
+                                       error=error, plan_provider=lambda: _plan_details(sql, params, pool))
+    
+    if warnings is not None:
+        warnings.extend(query_warnings)
+    if cache is not None:
+        cache.put(key, rows, columns, query_warnings, signature)
+    return (columns, rows) if with_columns else rows
+
+
+def _plan_details(sql: str, params: Tuple[Any, ...] = (),
+                  pool: Optional[ConnectionPool] = None) -> List[str]:
+    """EXPLAIN QUERY PLAN de una query, para el slow-query log."""
+    with (pool or get_pool()).connection() as conn:
+        return [detail for _, _, detail in explain_query_plan(conn, sql, params)]
+
+
+_fan_out_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_fan_out_executor() -> ThreadPoolExecutor:
+    global _fan_out_executor
+    if _fan_out_executor is None:
+        with _pool_lock:
+            if _fan_out_executor is None:
+                _fan_out_executor = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS,
+                                                       thread_name_prefix="shard")
+    return _fan_out_executor
+
+
+def run_query_per_shard(sql: str, params: Tuple[Any, ...] = (),
+                        seasons: Optional[Iterable[int]] = None, use_cache: bool = True,
+                        timeout: Optional[float] = None,
+                        cancel_event: Optional[threading.Event] = None,
+                        check_cost: bool = True,
+                        warnings: Optional[List[str]] = None) -> Tuple[List[str], List[Tuple]]:
+    """Ejecuta la misma query en cada shard de temporada en paralelo y une los resultados.
+
+    Cada fila lleva al inicio la temporada del shard (`shard_season`). Las
+    queries por fila se unen sin cambios; las agregadas (COUNT, SUM, GROUP BY)
+    quedan calculadas por temporada.
+
+    Args:
+        sql: La query SQL a ejecutar.
+        params: Los parámetros para la query.
+        seasons: Temporadas a consultar (None = todas).
+        use_cache: Si se usa la caché de resultados.
+        timeout: Tiempo máximo de ejecución en segundos, por shard.
+        cancel_event: Evento que, al activarse, interrumpe la query en todos los shards.
+        check_cost: Si se valida el plan de cada shard antes de ejecutar.
+        warnings: Lista a la que se agregan las advertencias del cost guard de
+            cada shard (sin repetir).
+
+    Returns:
+        Los nombres de las columnas y las filas de todos los shards.
+
+    Raises:
+        ValueError: Si la base de datos no está particionada.
+    """
+    _validate_select(sql)
+    pool = get_pool()
+    if not isinstance(pool, ShardedConnectionPool):
+        raise ValueError("La base de datos no está particionada por temporada; usa la query normal.")
+    shard_pools = pool.shard_pools(seasons)
+    
+    start = time.perf_counter()
+    cache = get_query_cache() if use_cache else None
+    key = QueryCache.make_key(sql, params) + (("shards", tuple(season for season, _ in shard_pools)),)
+    if cache is not None:
+        cached = cache.get(key, with_columns=True, warnings=warnings)
+        if cached is not None:
+            get_query_stats().record_query(key[0], time.perf_counter() - start, len(cached[1]), cached=True)
+            return cached
+        signature = cache.signature()
+    
+    def _run_shard(season: int, shard_pool: ConnectionPool) -> Tuple[List[str], List[Tuple], List[str]]:
+        with shard_pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                with _query_guard(conn, timeout, cancel_event):
+                    shard_warnings = []
+                    if check_cost:
+                        sql_to_run, report = check_query(conn, sql, params)
+                        shard_warnings = report["warnings"]
+                    else:
+                        sql_to_run = sql
+                    cur.execute(sql_to_run, params)
+                    rows = [(season,) + row for row in cur.fetchall()]
+                return ["shard_season"] + [d[0] for d in cur.description or ()], rows, shard_warnings
+            finally:
+                cur.close()
+    
+    columns: List[str] = []
+    rows: List[Tuple] = []
+    query_warnings: List[str] = []
+    error = None
+    try:
+        futures = [_get_fan_out_executor().submit(_run_shard, season, shard_pool)
+                   for season, shard_pool in shard_pools]
+        try:
+            for future in futures:
+                shard_columns, shard_rows, shard_warnings = future.result()
+                columns = columns or shard_columns
+                rows.extend(shard_rows)
+                query_warnings += [w for w in shard_warnings if w not in query_warnings]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        get_query_stats().record_query(key[0], time.perf_counter() - start, len(rows), cached=False,
+                                       error=error,
+                                       plan_provider=lambda: _plan_details(sql, params, shard_pools[0][1]))
+    
+    if warnings is not None:
+        warnings.extend(query_warnings)
+    if cache is not None:
+        cache.put(key, rows, columns, query_warnings, signature)
+    return columns, rows
+
+
+class _PagedCursor:
+    """Sentencia abierta en el servidor con su conexión prestada del pool."""
+
+    def __init__(self, pool: ConnectionPool, conn: sqlite3.Connection, generation: int,
+                 cur: sqlite3.Cursor, page_size: int):
+        self.pool = pool
+        self.conn = conn
+        self.generation = generation
+        self.cur = cur
+        self.page_size = page_size
+        self.columns = [d[0] for d in cur.description or ()]
+        self.pending: List[Tuple] = []
+        self.closed = False
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class PagedQueryRegistry:
+    """Mantiene abiertas las sentencias de queries paginadas.
+
+    Cada página se obtiene con `fetchmany`, así que la memoria y el tamaño de
+    cada respuesta quedan acotados por `page_size`. Los cursores inactivos por
+    más de `idle_seconds` se cierran y devuelven su conexión al pool; mientras
+    haya cursores abiertos, un timer los revisa cada `reap_seconds`, así que un
+    cursor abandonado no retiene su conexión (ni el lock SHARED de su sentencia,
+    que bloquearía al ETL) aunque no lleguen más llamadas.
+    """
+
+    def __init__(self, pool: ConnectionPool, idle_seconds: float = CURSOR_IDLE_SECONDS,
+                 max_open: int = MAX_OPEN_CURSORS, reap_seconds: float = CURSOR_REAP_SECONDS):
+        self.pool = pool
+        self.idle_seconds = idle_seconds
+        self.max_open = max_open
+        self.reap_seconds = reap_seconds
+        self._cursors: "OrderedDict[str, _PagedCursor]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Timer] = None
+
+    def _schedule_reaper(self):
+        """Programa la próxima revisión si hay cursores abiertos. Requiere el lock."""
+        if self._reaper is None and self._cursors:
+            self._reaper = threading.Timer(self.reap_seconds, self._reap)
+            self._reaper.daemon = True
+            self._reaper.start()
+
+    def _reap(self):
+        """Revisión periódica del timer."""
+        with self._lock:
+            self._reaper = None
+        self.expire_idle()
+        with self._lock:
+            self._schedule_reaper()
+
+    def _close(self, state: _PagedCursor):
+        """Cierra la sentencia y devuelve la conexión al pool."""
+        if state.closed:
+            return
+        state.closed = True
+        try:
+            state.cur.close()
+        finally:
+            state.pool.release(state.conn, state.generation)
+
+    def expire_idle(self):
+        """Cierra los cursores inactivos por más de `idle_seconds`.
+
+        El máximo de abiertos solo se aplica en `open`, al registrar un cursor
+        nuevo: una página pedida o una vuelta del timer no cierran cursores en uso.
+        """
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for token, state in list(self._cursors.items()):
+                if now - state.last_used > self.idle_seconds:
+                    expired.append(self._cursors.pop(token))
+        for state in expired:
+            with state.lock:
+                self._close(state)
+
+    def _next_page(self, state: _PagedCursor, timeout: Optional[float],
+                   cancel_event: Optional[threading.Event]) -> Tuple[List[Tuple], bool]:
+        """Lee la siguiente página; devuelve (filas, hay_más). Requiere state.lock."""
+        with _query_guard(state.conn, timeout, cancel_event):
+            rows = state.pending + state.cur.fetchmany(state.page_size + 1 - len(state.pending))
+        state.pending = rows[state.page_size:]
+        state.last_used = time.monotonic()
+        return rows[:state.page_size], bool(state.pending)
+
+    def open(self, sql: str, params: Tuple[Any, ...] = (), page_size: int = DEFAULT_PAGE_SIZE,
+             timeout: Optional[float] = None,
+             cancel_event: Optional[threading.Event] = None,
+             seasons: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+        """Ejecuta la query y devuelve columnas, primera página y token del cursor.
+
+        `seasons` restringe los shards adjuntos, como en `run_query`. Las
+        advertencias del cost guard van en `warnings` (solo si hay).
+        """
+        _validate_select(sql)
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        self.expire_idle()
+        pool = self.pool
+        if seasons is not None and isinstance(pool, ShardedConnectionPool):
+            pool = pool.scoped(seasons)
+        
+        start = time.perf_counter()
+        conn, generation = pool.acquire()
+        state = None
+        rows = []
+        error = None
+        try:
+            cur = conn.cursor()
+            with _query_guard(conn, timeout, cancel_event):
+                checked_sql, report = check_query(conn, sql, params, limit_budget=None)
+                cur.execute(checked_sql, params)
+            state = _PagedCursor(pool, conn, generation, cur, page_size)
+            rows, has_more = self._next_page(state, timeout, cancel_event)
+        except BaseException as e:
+            error = e
+            if state is not None:
+                self._close(state)
+            else:
+                pool.release(conn, generation)
+            raise
+        finally:
+            # Solo se mide la primera página: las siguientes son fetchmany sobre el mismo cursor
+            get_query_stats().record_query(normalize_sql(sql), time.perf_counter() - start, len(rows),
+                                           cached=False, error=error,
+                                           plan_provider=lambda: _plan_details(sql, params, pool))
+        
+        token = None
+        if has_more:
+            token = secrets.token_urlsafe(16)
+            evicted = []
+            with self._lock:
+                # Hace lugar cerrando los cursores usados hace más tiempo
+                while len(self._cursors) >= self.max_open:
+                    evicted.append(self._cursors.popitem(last=False)[1])
+                self._cursors[token] = state
+                self._schedule_reaper()
+            for old in evicted:
+                with old.lock:
+                    self._close(old)
+        else:
+            self._close(state)
+        page = {"columns": state.columns, "rows": rows, "cursor": token}
+        if report["warnings"]:
+            page["warnings"] = report["warnings"]
+        return page
+
+    def fetch(self, token: str, timeout: Optional[float] = None,
+              cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """Devuelve la siguiente página de un cursor abierto."""
+        self.expire_idle()
+        with self._lock:
+            state = self._cursors.get(token)
+            if state is not None:
+                self._cursors.move_to_end(token)
+        if state is None:
+            raise ValueError("Cursor desconocido o expirado. Vuelve a ejecutar la query.")
+        state.last_used = time.monotonic()
+        
+        with state.lock:
+            if state.closed:
+                raise ValueError("Cursor desconocido o expirado. Vuelve a ejecutar la query.")
+            try:
+                rows, has_more = self._next_page(state, timeout, cancel_event)
+            except BaseException:
+                has_more = False
+                raise
+            finally:
+                if not has_more:
+                    with self._lock:
+                        self._cursors.pop(token, None)
+                    self._close(state)
+        return {"columns": state.columns, "rows": rows, "cursor": token if has_more else None}
+
+    def close(self, token: str) -> bool:
+        """Cierra un cursor antes de leer todas sus páginas."""
+        with self._lock:
+            state = self._cursors.pop(token, None)
+        if state is None:
+            return False
+        with state.lock:
+            self._close(state)
+        return True
+
+    def stats(self) -> dict:
+        """Estadísticas de los cursores abiertos."""
+        with self._lock:
+            return {"open": len(self._cursors), "max_open": self.max_open}
+
+
+_paged_queries: Optional[PagedQueryRegistry] = None
+
+
+def get_paged_queries() -> PagedQueryRegistry:
+    """Obtiene el registro de queries paginadas del proceso."""
+    global _paged_queries
+    if _paged_queries is None:
+        with _pool_lock:
+            if _paged_queries is None:
+                _paged_queries = PagedQueryRegistry(get_pool())
+    return _paged_queries
+
+
+def warm_up(statements: Sequence[Tuple[str, Tuple[Any, ...]]] = (),
+            connections: Optional[int] = None) -> Dict[str, Any]:
+    """Precarga la BD antes de atender clientes.
+
+    Lee cada archivo de la BD (hasta `mmap_size` bytes) para dejar sus páginas
+    en la caché del sistema operativo, que comparten todas las conexiones y los
+    procesos que mapean el archivo con mmap. Después abre `connections`
+    conexiones del pool (por defecto `max_size`) y ejecuta en cada una las
+    `statements` (sql, params), que quedan compiladas en su caché de sentencias
+    y con las páginas de sus índices en la caché de SQLite.
+    """
+    start = time.perf_counter()
+    pool = get_pool()
+    files = [path for path in _db_files(pool.db_path) if not _is_manifest(path)]
+    bytes_read = 0
+    for path in files:
+        with open(path, "rb") as f:
+            read = 0
+            while read < pool.mmap_size:
+                chunk = f.read(WARMUP_CHUNK_BYTES)
+                if not chunk:
+                    break
+                read += len(chunk)
+        bytes_read += read
+
+    held = []
+    prepared = 0
+    try:
+        for _ in range(max(1, connections or pool.max_size)):
+            held.append(pool.acquire())
+        for conn, _ in held:
+            for sql, params in statements:
+                cur = conn.execute(sql, params)
+                cur.fetchmany(1)
+                cur.close()
+                prepared += 1
+    finally:
+        for conn, generation in held:
+            pool.release(conn, generation)
+    return {
+        "files": len(files),
+        "bytes_read": bytes_read,
+        "connections": len(held),
+        "statements_prepared": prepared,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def configure_database(db_path) -> None:
+    """Apunta el servidor a otra base de datos (por ejemplo en benchmarks).
+
+    `db_path` puede ser un archivo .db o el `manifest.json` de una BD particionada.
+
+    Cierra el pool actual y descarta la caché y los cursores paginados.
+    """
+    global _db_path_override, _pool, _cache, _paged_queries
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _db_path_override = Path(db_path).resolve() if db_path is not None else None
+        _pool = None
+        _cache = None
+        _paged_queries = None
@@ -1,24 +1,956 @@
-from mcp.server.fastmcp import FastMCP
-from db_connection import run_query
-from mcp.types import Context
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional
+
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.transport_security import TransportSecuritySettings
+from db_connection import (
+    configure_database, get_paged_queries, get_pool, get_query_cache, run_query, run_query_per_shard,
+    shard_batches, warm_up,
+)
+from query_stats import get_query_stats, slow_query_logger
+from result_encoding import DEFAULT_MAX_RESPONSE_BYTES, encode_result, encode_result_sized, validate_format
+
+# Límites de ejecución de queries
+QUERY_WORKERS = 4
+QUERY_TIMEOUT_SECONDS = 10.0
+# Herramientas que un mismo cliente puede ejecutar a la vez; las demás esperan turno
+CLIENT_MAX_CONCURRENCY = 4
+# Cabecera HTTP opcional con la que un agente se identifica para ese límite
+CLIENT_ID_HEADER = "x-client-id"
+
+# Transporte streamable-http
+HTTP_HOST = "127.0.0.1"
+HTTP_PORT = 8000
+# Hosts que la protección contra DNS rebinding acepta siempre (más los de --allowed-host)
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+# Variable de entorno con la que el proceso principal pasa sus opciones a los workers
+SERVER_OPTIONS_ENV = "MCP_VOLEYBALL_SERVER_OPTIONS"
+
+# Elementos de una lista que se serializan para estimar el tamaño de una respuesta grande
+RESPONSE_SIZE_SAMPLE = 64
+
+# Archivo del slow-query log (ver query_stats.SLOW_QUERY_MS)
+SLOW_QUERY_LOG = Path(__file__).resolve().parent / "slow_queries.log"
+
+logger = logging.getLogger("mcp_voleyball")
 
 # Crear instancia del servidor MCP
 mcp = FastMCP("mcp-voleyball")
 
-@mcp.tool()
-def execute_query(query: str, ctx: Context) -> list:
+# Pool acotado de hilos para no bloquear el event loop del servidor
+_query_workers = QUERY_WORKERS
+_query_executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="query")
+
+
+# Bytes de respuesta medidos en los hilos de trabajo durante la herramienta en curso
+_response_size = contextvars.ContextVar("response_size", default=0)
+
+
+class _Sized:
+    """Resultado de una función de trabajo junto con su tamaño JSON ya conocido."""
+
+    __slots__ = ("value", "size")
+
+    def __init__(self, value, size: int):
+        self.value = value
+        self.size = size
+
+
+async def _run_in_worker(func, *args, **kwargs):
+    """Ejecuta una función de BD en el pool de hilos, interrumpiéndola si se cancela la request.
+
+    El tamaño JSON del resultado (para query_stats) se estima en el mismo hilo,
+    salvo que la función lo devuelva ya medido en un `_Sized`.
+    """
+    cancel_event = threading.Event()
+    loop = asyncio.get_running_loop()
+
+    def _call():
+        result = func(*args, cancel_event=cancel_event, **kwargs)
+        if isinstance(result, _Sized):
+            return result.value, result.size
+        return result, _response_bytes(result)
+
+    future = loop.run_in_executor(_query_executor, _call)
+    try:
+        result, size = await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # Cancelación MCP: se interrumpe la sentencia en SQLite
+        cancel_event.set()
+        raise
+    _response_size.set(_response_size.get() + size)
+    return result
+
+
+def _json_bytes(value) -> int:
+    """Bytes de `value` serializado en JSON compacto."""
+    return len(json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _response_bytes(result) -> int:
+    """Tamaño aproximado de la respuesta serializada en JSON.
+
+    FastMCP serializa la respuesta de todos modos, así que las listas grandes
+    no se serializan enteras: se mide una muestra de `RESPONSE_SIZE_SAMPLE`
+    elementos repartidos y se extrapola.
+    """
+    try:
+        if isinstance(result, dict) and result:
+            return 1 + sum(_json_bytes(key) + 2 + _response_bytes(value) for key, value in result.items())
+        if isinstance(result, (list, tuple)) and len(result) > RESPONSE_SIZE_SAMPLE:
+            step = len(result) / RESPONSE_SIZE_SAMPLE
+            sample = [result[int(i * step)] for i in range(RESPONSE_SIZE_SAMPLE)]
+            # Cada elemento con su coma; la muestra trae sus propios corchetes
+            return int((_json_bytes(sample) - 1) * len(result) / RESPONSE_SIZE_SAMPLE) + 1
+        return _json_bytes(result)
+    except (TypeError, ValueError):
+        return 0
+
+
+class _ClientLimiter:
+    """Limita las herramientas en curso de cada cliente en este proceso.
+
+    Con varios workers (`--processes N`) cada uno tiene su limitador, así que
+    un cliente puede tener hasta N × `max_concurrency` llamadas en curso.
+    Se usa solo desde el event loop, así que no necesita locks. El semáforo de
+    un cliente se descarta cuando no le quedan llamadas en curso ni en espera.
+    """
+
+    def __init__(self, max_concurrency: int = CLIENT_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._clients: Dict[Hashable, list] = {}
+        self.waits = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self, key: Hashable):
+        """Espera un turno libre del cliente `key` y lo ocupa durante el bloque."""
+        entry = self._clients.get(key)
+        if entry is None:
+            entry = self._clients[key] = [asyncio.Semaphore(self.max_concurrency), 0]
+        semaphore = entry[0]
+        entry[1] += 1
+        try:
+            if semaphore.locked():
+                self.waits += 1
+            async with semaphore:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._clients[key]
+
+    def stats(self) -> dict:
+        """Estadísticas del limitador."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "clients": len(self._clients),
+            "pending": sum(users for _, users in self._clients.values()),
+            "waits": self.waits,
+        }
+
+
+_client_limiter = _ClientLimiter()
+# Marca las llamadas que ya ocupan un turno (search_entities llama a team_lookup)
+_in_client_slot = contextvars.ContextVar("in_client_slot", default=False)
+
+
+def _client_key() -> Optional[Hashable]:
+    """Identifica al cliente de la request actual, o None fuera de una request.
+
+    Por HTTP se usa la cabecera `CLIENT_ID_HEADER`, la sesión MCP o la IP de
+    origen (en modo stateless no hay sesión); por stdio, la sesión.
+    """
+    try:
+        request_context = mcp.get_context().request_context
+    except ValueError:
+        return None
+    request = getattr(request_context, "request", None)
+    if request is not None:
+        client_id = request.headers.get(CLIENT_ID_HEADER)
+        if client_id:
+            return ("id", client_id)
+        session_id = request.headers.get("mcp-session-id")
+        if session_id:
+            return ("session", session_id)
+        if request.client is not None:
+            return ("addr", request.client.host)
+    return request_context.session
+
+
+@contextlib.asynccontextmanager
+async def _client_slot():
+    """Ocupa un turno del cliente actual; las llamadas anidadas usan el de la externa."""
+    key = None if _in_client_slot.get() else _client_key()
+    if key is None:
+        yield
+        return
+    token = _in_client_slot.set(True)
+    try:
+        async with _client_limiter.slot(key):
+            yield
+    finally:
+        _in_client_slot.reset(token)
+
+
+def _instrumented(func):
+    """Registra latencia, bytes de respuesta y errores de una herramienta en query_stats.
+
+    Las herramientas asíncronas, que van a la BD, respetan además el límite de
+    llamadas en curso por cliente (la latencia registrada incluye la espera), y
+    sus bytes de respuesta se miden en los hilos de trabajo (`_run_in_worker`).
+    """
+    stats = get_query_stats()
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            token = _response_size.set(0)
+            try:
+                async with _client_slot():
+                    result = await func(*args, **kwargs)
+            except Exception as e:
+                stats.record_tool(func.__name__, time.perf_counter() - start, 0, error=e)
+                raise
+            finally:
+                size = _response_size.get()
+                _response_size.reset(token)
+            # Una herramienta llamada desde otra también cuenta para la externa
+            _response_size.set(_response_size.get() + size)
+            stats.record_tool(func.__name__, time.perf_counter() - start, size)
+            return result
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                stats.record_tool(func.__name__, time.perf_counter() - start, 0, error=e)
+                raise
+            stats.record_tool(func.__name__, time.perf_counter() - start, _response_bytes(result))
+            return result
+    return wrapper
+
+
+def _tool():
+    """Igual que `mcp.tool()`, pero con la herramienta instrumentada."""
+    def decorator(func):
+        return mcp.tool()(_instrumented(func))
+    return decorator
+
+
+def _encoded_query(query: str, fmt: str, max_bytes: int, offset: int,
+                   cancel_event: threading.Event, per_season: bool = False,
+                   seasons: Optional[List[int]] = None,
+                   warnings: Optional[List[str]] = None) -> list | _Sized:
+    """Ejecuta la query y codifica el resultado en el hilo de trabajo.
+
+    Las advertencias del cost guard se agregan a `warnings` y, salvo en
+    'tuples', también van en el resultado, que se devuelve con su tamaño.
+    """
+    warnings = [] if warnings is None else warnings
+    if per_season:
+        columns, rows = run_query_per_shard(query, seasons=seasons, timeout=QUERY_TIMEOUT_SECONDS,
+                                            cancel_event=cancel_event, warnings=warnings)
+    else:
+        columns, rows = run_query(query, timeout=QUERY_TIMEOUT_SECONDS, cancel_event=cancel_event,
+                                  with_columns=True, seasons=seasons, warnings=warnings)
+    if fmt == "tuples":
+        return rows
+    result, size = encode_result_sized(columns, rows, fmt, max_bytes or DEFAULT_MAX_RESPONSE_BYTES, offset)
+    if warnings:
+        result["warnings"] = warnings
+        size += _json_bytes({"warnings": warnings}) - 1
+    # El tamaño ya se midió al ajustar el presupuesto de bytes
+    return _Sized(result, size)
+
+
+def _encoded_page(fetch, fmt: str, *args, cancel_event: threading.Event, **kwargs) -> dict:
+    """Obtiene una página paginada y la codifica en `fmt` (el tamaño lo acota `page_size`)."""
+    page = fetch(*args, timeout=QUERY_TIMEOUT_SECONDS, cancel_event=cancel_event, **kwargs)
+    if fmt == "tuples":
+        return page
+    result = encode_result(page["columns"], page["rows"], fmt)
+    del result["next_offset"]
+    result["cursor"] = page["cursor"]
+    if page.get("warnings"):
+        result["warnings"] = page["warnings"]
+    return result
+
+
+async def _send_warnings(ctx: Context, warnings: List[str]):
+    """Envía advertencias al cliente como mensajes de log MCP (el formato 'tuples' no tiene dónde llevarlas)."""
+    try:
+        for warning in warnings:
+            await ctx.warning(warning)
+    except ValueError:
+        # Llamada fuera de una request MCP: no hay sesión a la que enviarlas
+        pass
+
+
+@_tool()
+async def execute_query(query: str, ctx: Context, page_size: int = 0, format: str = "tuples",
+                        max_bytes: int = 0, offset: int = 0, per_season: bool = False,
+                        seasons: Optional[List[int]] = None) -> list | dict:
     """
     Ejecuta una query SQL en la base de datos de voleibol.
 
     Args:
         query: La query SQL a ejecutar.
+        page_size: Si es mayor que 0, devuelve el resultado paginado (máximo 1000 filas por página).
+        format: 'tuples' (lista de tuplas), 'rows' (nombres de columnas una vez y filas) o
+            'columnar' (valores por columna; las columnas constantes van como `const` y los
+            textos repetidos como `dict` + `codes`).
+        max_bytes: Presupuesto de bytes de la respuesta para 'rows' y 'columnar' (0 = 256 KiB).
+        offset: Fila desde la que continuar un resultado recortado (`next_offset`).
+        per_season: Si la BD está particionada por temporada, ejecuta la query en cada
+            shard en paralelo y une las filas, con la temporada como primera columna
+            (`shard_season`). Las agregaciones quedan calculadas por temporada.
+        seasons: En una BD particionada, las temporadas a consultar (por defecto todas):
+            solo se adjuntan sus shards. Sin `per_season` las vistas unen esas temporadas;
+            con más shards que el límite de ATTACH de SQLite hay que indicarlas o usar
+            `per_season`.
+
+    Returns:
+        Una lista de tuplas con los resultados de la query. Con 'rows' o 'columnar', un
+        diccionario con `columns`, los datos y `next_offset` (None si el resultado está
+        completo; si no, se repite la llamada con `offset=next_offset`). En modo paginado,
+        un diccionario con `columns`, `rows` y `cursor` (None si no hay más páginas).
+        Si la query hace scans completos de tablas grandes, los diccionarios llevan
+        `warnings` con las columnas indexadas por las que conviene filtrar; con
+        'tuples' sin paginar se envían como mensajes de log de nivel warning.
+    """
+    fmt = validate_format(format)
+    if fmt == "tuples" and (max_bytes or offset):
+        raise ValueError("max_bytes y offset requieren format 'rows' o 'columnar'.")
+    if per_season:
+        if page_size > 0:
+            raise ValueError("per_season no admite paginación; usa format 'rows' o 'columnar' con max_bytes.")
+    if page_size > 0:
+        return await _run_in_worker(
+            _encoded_page, get_paged_queries().open, fmt, query, page_size=page_size, seasons=seasons
+        )
+    warnings: List[str] = []
+    result = await _run_in_worker(_encoded_query, query, fmt, max_bytes, max(0, offset),
+                                  per_season=per_season, seasons=seasons, warnings=warnings)
+    if fmt == "tuples" and warnings:
+        await _send_warnings(ctx, warnings)
+    return result
+
+
+@_tool()
+async def fetch_next_page(cursor: str, format: str = "tuples") -> dict:
+    """
+    Obtiene la siguiente página de una query ejecutada con `execute_query` en modo paginado.
+
+    Args:
+        cursor: El token `cursor` devuelto por la página anterior.
+        format: 'tuples', 'rows' o 'columnar', como en `execute_query`.
+
+    Returns:
+        Un diccionario con `columns`, las filas y `cursor` (None si no hay más páginas).
+    """
+    return await _run_in_worker(_encoded_page, get_paged_queries().fetch, validate_format(format), cursor)
+
+
+def _close_page_cursor(cursor: str, cancel_event: threading.Event) -> bool:
+    """Cierra un cursor paginado; espera a que termine la página que se esté leyendo."""
+    return get_paged_queries().close(cursor)
+
+
+@_tool()
+async def close_cursor(cursor: str) -> bool:
+    """
+    Cierra un cursor paginado que ya no se va a leer.
+
+    Args:
+        cursor: El token del cursor a cerrar.
+
+    Returns:
+        True si el cursor estaba abierto.
+    """
+    return await _run_in_worker(_close_page_cursor, cursor)
+
+
+# Columnas de totales de las tablas agregadas del ETL
+_TOTAL_COLUMNS = (
+    "played", "won", "lost", "sets_won", "sets_lost", "points_won", "points_lost", "point_diff"
+)
+
+
+def _records(columns: tuple, rows: list) -> List[dict]:
+    """Convierte filas en diccionarios con los nombres de columnas."""
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _team_record_sql(by_season: bool) -> str:
+    return f"""
+        SELECT t.no, t.code, t.name, r.season, {', '.join('r.' + c for c in _TOTAL_COLUMNS)}
+        FROM teams t JOIN team_season_records r ON r.team_no = t.no
+        WHERE t.code = ?{' AND r.season = ?' if by_season else ''}
+        ORDER BY r.season DESC
+    """
+
+
+def _pool_standings_sql(by_pool: bool) -> str:
+    return f"""
+        SELECT p.code, p.name, t.code, t.name, {', '.join('s.' + c for c in _TOTAL_COLUMNS)}
+        FROM pool_standings s
+        JOIN pools p ON p.no = s.pool_no
+        JOIN teams t ON t.no = s.team_no
+        WHERE s.tournament_no = ?{' AND p.code = ?' if by_pool else ''}
+        ORDER BY p.code, s.won DESC, s.sets_won - s.sets_lost DESC, s.point_diff DESC
+    """
+
+
+# SQL de las herramientas de agregados: una variante constante por combinación de filtros
+_SQL_TEAM_RECORD = _team_record_sql(by_season=False)
+_SQL_TEAM_RECORD_SEASON = _team_record_sql(by_season=True)
+_SQL_POOL_STANDINGS = _pool_standings_sql(by_pool=False)
+_SQL_POOL_STANDINGS_POOL = _pool_standings_sql(by_pool=True)
+_SQL_HEAD_TO_HEAD = f"""
+    SELECT a.no, a.name, b.no, b.name, {', '.join('h.' + c for c in _TOTAL_COLUMNS)}
+    FROM teams a
+    JOIN head_to_head h ON h.team_no = a.no
+    JOIN teams b ON b.no = h.opponent_no
+    WHERE a.code = ? AND b.code = ?
+"""
+
+
+def _sorted_rows(key, reverse: bool = False):
+    """Une las filas de varios grupos de shards respetando el ORDER BY de la query."""
+    return lambda rows: sorted(rows, key=key, reverse=reverse)
+
+
+def _sum_rows(key_columns: int, total_columns: int, order=None):
+    """Une las filas de varios grupos de shards sumando los totales por clave.
+
+    Cada fila tiene `key_columns` columnas de identificación (la clave son las
+    de índice par: números o códigos de pool y equipo) seguidas de
+    `total_columns` totales. Con `order`, ordena las filas sumadas con esa clave.
+    """
+    def merge(rows):
+        merged: Dict[tuple, list] = {}
+        for row in rows:
+            key = row[:key_columns:2]
+            if key in merged:
+                entry = merged[key]
+                for i in range(key_columns, key_columns + total_columns):
+                    entry[i] += row[i]
+            else:
+                merged[key] = list(row)
+        rows = [tuple(entry) for entry in merged.values()]
+        return sorted(rows, key=order) if order is not None else rows
+    return merge
+
+
+def _fixed_records(sql: str, params: tuple, columns: tuple, cancel_event: threading.Event,
+                   merge=None, catalog_only: bool = False) -> List[dict]:
+    """Ejecuta una query fija y arma los registros en el hilo de trabajo.
+
+    Si la BD particionada tiene más shards de los que SQLite adjunta en una
+    conexión, la query corre sobre cada grupo de temporadas y `merge` une los
+    resultados; las queries de `catalog_only` (equipos, torneos, búsqueda) no
+    adjuntan shards.
+    """
+    kwargs = dict(timeout=QUERY_TIMEOUT_SECONDS, cancel_event=cancel_event, check_cost=False)
+    batches = shard_batches()
+    if batches is None:
+        rows = run_query(sql, params, **kwargs)
+    elif catalog_only:
+        rows = run_query(sql, params, seasons=(), **kwargs)
+    else:
+        rows = []
+        for batch in batches:
+            rows += run_query(sql, params, seasons=batch, **kwargs)
+        if merge is not None:
+            rows = merge(rows)
+    return _records(columns, rows)
+
+
+async def _run_fixed_query(sql: str, params: tuple, columns: tuple, merge=None,
+                           catalog_only: bool = False) -> List[dict]:
+    """Ejecuta una query fija y parametrizada de las herramientas tipadas.
+
+    El texto SQL es constante, así que la sentencia preparada se reutiliza en
+    cada conexión del pool; al ser indexada no pasa por el cost guard. Devuelve
+    un diccionario por fila con las claves de `columns`.
+    """
+    return await _run_in_worker(_fixed_records, sql, params, columns, merge=merge,
+                                catalog_only=catalog_only)
+
+
+@_tool()
+async def team_record(team_code: str, season: Optional[int] = None) -> List[dict]:
+    """
+    Récord de victorias/derrotas, sets y puntos de un equipo por temporada.
+
+    Args:
+        team_code: Código del equipo (por ejemplo 'COL').
+        season: Temporada (año); si se omite, devuelve todas.
+
+    Returns:
+        Una lista con un registro por equipo y temporada.
+    """
+    sql = _SQL_TEAM_RECORD_SEASON if season is not None else _SQL_TEAM_RECORD
+    params = (team_code.upper(),) + ((season,) if season is not None else ())
+    return await _run_fixed_query(sql, params, ("team_no", "code", "name", "season") + _TOTAL_COLUMNS,
+                                  merge=_sorted_rows(lambda row: row[3], reverse=True))
+
+
+@_tool()
+async def head_to_head(team_code: str, opponent_code: str) -> List[dict]:
+    """
+    Historial entre dos equipos: partidos, victorias, sets y puntos desde el lado de `team_code`.
+
+    Args:
+        team_code: Código del equipo (por ejemplo 'COL').
+        opponent_code: Código del rival (por ejemplo 'BRA').
+
+    Returns:
+        Una lista con un registro por par de equipos.
+    """
+    return await _run_fixed_query(_SQL_HEAD_TO_HEAD, (team_code.upper(), opponent_code.upper()),
+                                  ("team_no", "team", "opponent_no", "opponent") + _TOTAL_COLUMNS,
+                                  merge=_sum_rows(4, len(_TOTAL_COLUMNS)))
+
+
+@_tool()
+async def pool_standings(tournament_no: int, pool_code: Optional[str] = None) -> List[dict]:
+    """
+    Tabla de posiciones por pool/grupo de un torneo.
+
+    Args:
+        tournament_no: Número del torneo (por ejemplo 1520).
+        pool_code: Código del pool (por ejemplo 'D'); si se omite, devuelve todos.
+
+    Returns:
+        Una lista ordenada por pool, victorias y diferencia de puntos.
+    """
+    sql = _SQL_POOL_STANDINGS_POOL if pool_code else _SQL_POOL_STANDINGS
+    params = (tournament_no,) + ((pool_code,) if pool_code else ())
+    return await _run_fixed_query(
+        sql, params, ("pool_code", "pool", "team_code", "team") + _TOTAL_COLUMNS,
+        # Un equipo puede tener partidos del torneo en más de un grupo de shards
+        merge=_sum_rows(4, len(_TOTAL_COLUMNS),
+                        order=lambda row: (row[0] or "", -row[5], row[8] - row[7], -row[11])),
+    )
+
+
+_MATCH_COLUMNS = (
+    "match_no", "match_date_utc", "tournament_no", "team_a_code", "team_a", "team_b_code", "team_b",
+    "team_a_score", "team_b_score", "winner_code", "match_status",
+)
+
+_MATCH_SELECT = """
+    SELECT m.match_no, m.match_date_utc, m.tournament_no, ta.code, ta.name, tb.code, tb.name,
+           m.team_a_score, m.team_b_score, w.code, m.match_status
+"""
+
+# Una rama por lado del partido, cada una sobre su índice (equipo, fecha): con
+# `team_a_no = t.no OR team_b_no = t.no` SQLite recorre el rango de fechas entero
+_SQL_MATCHES_BY_TEAM = _MATCH_SELECT + """
+    FROM (
+        SELECT m.* FROM teams t JOIN matches m ON m.team_a_no = t.no
+        WHERE t.code = ?1 AND m.match_date_utc >= ?2 AND m.match_date_utc < date(?3, '+1 day')
+        UNION ALL
+        SELECT m.* FROM teams t JOIN matches m ON m.team_b_no = t.no
+        WHERE t.code = ?1 AND m.match_date_utc >= ?2 AND m.match_date_utc < date(?3, '+1 day')
+    ) m
+    JOIN teams ta ON ta.no = m.team_a_no
+    JOIN teams tb ON tb.no = m.team_b_no
+    LEFT JOIN teams w ON w.no = m.winner_team_no
+    ORDER BY m.match_date_utc
+"""
+
+
+def _iso_date(value: str, name: str) -> str:
+    """Valida una fecha YYYY-MM-DD (con una fecha inválida `date()` de SQLite devuelve NULL)."""
+    try:
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} debe ser una fecha YYYY-MM-DD (recibido: {value!r}).") from None
+
+_SQL_TOURNAMENT_SCHEDULE = """
+    SELECT m.match_no, m.match_date_utc, m.tournament_no, ta.code, ta.name, tb.code, tb.name,
+           m.team_a_score, m.team_b_score, w.code, m.match_status, p.code, r.name, m.city
+    FROM matches m
+    JOIN teams ta ON ta.no = m.team_a_no
+    JOIN teams tb ON tb.no = m.team_b_no
+    LEFT JOIN teams w ON w.no = m.winner_team_no
+    LEFT JOIN pools p ON p.no = m.pool_no
+    LEFT JOIN rounds r ON r.no = m.round_no
+    WHERE m.tournament_no = ?
+    ORDER BY m.match_date_utc
+"""
+
+_SQL_MATCH_SETS = """
+    SELECT s.set_number, s.points_team_a, s.points_team_b
+    FROM sets s
+    WHERE s.match_no = ?
+    ORDER BY s.set_number
+"""
+
+_SQL_TEAM_LOOKUP = """
+    SELECT no, code, name, country, translated_name, tournament_code, is_club
+    FROM teams
+    WHERE code = ?
+"""
+
+
+@_tool()
+async def matches_by_team(team_code: str, date_from: str = "1900-01-01",
+                          date_to: str = "2100-12-31") -> List[dict]:
+    """
+    Partidos de un equipo en un rango de fechas.
+
+    Args:
+        team_code: Código del equipo (por ejemplo 'COL').
+        date_from: Fecha inicial YYYY-MM-DD (inclusive).
+        date_to: Fecha final YYYY-MM-DD (inclusive).
+
+    Returns:
+        Una lista de partidos ordenada por fecha.
+    """
+    date_from = _iso_date(date_from, "date_from")
+    date_to = _iso_date(date_to, "date_to")
+    if date_from > date_to:
+        raise ValueError(f"date_from ({date_from}) es posterior a date_to ({date_to}).")
+    return await _run_fixed_query(_SQL_MATCHES_BY_TEAM, (team_code.upper(), date_from, date_to),
+                                  _MATCH_COLUMNS, merge=_sorted_rows(lambda row: row[1] or ""))
+
+
+@_tool()
+async def tournament_schedule(tournament_no: int) -> List[dict]:
+    """
+    Calendario y resultados de un torneo.
+
+    Args:
+        tournament_no: Número del torneo (por ejemplo 1520).
+
+    Returns:
+        Una lista de partidos ordenada por fecha, con pool, ronda y ciudad.
+    """
+    return await _run_fixed_query(_SQL_TOURNAMENT_SCHEDULE, (tournament_no,),
+                                  _MATCH_COLUMNS + ("pool_code", "round", "city"),
+                                  merge=_sorted_rows(lambda row: row[1] or ""))
+
+
+@_tool()
+async def match_sets(match_no: int) -> List[dict]:
+    """
+    Puntos de cada set de un partido.
+
+    Args:
+        match_no: Número del partido.
+
+    Returns:
+        Una lista con un registro por set.
+    """
+    return await _run_fixed_query(_SQL_MATCH_SETS, (match_no,),
+                                  ("set_number", "points_team_a", "points_team_b"),
+                                  merge=_sorted_rows(lambda row: row[0]))
+
+
+@_tool()
+async def team_lookup(team_code: str) -> List[dict]:
+    """
+    Busca los equipos con un código (puede haber uno por torneo/género).
+
+    Args:
+        team_code: Código del equipo (por ejemplo 'COL').
 
     Returns:
-        Una lista de tuplas con los resultados de la query.
+        Una lista de equipos con su número (`no`) para usar en otras queries.
     """
-    rows = run_query(query)
-    return rows
+    return await _run_fixed_query(
+        _SQL_TEAM_LOOKUP, (team_code.upper(),),
+        ("no", "code", "name", "country", "translated_name", "tournament_code", "is_club"),
+        catalog_only=True,
+    )
+
+
+_SQL_SEARCH_ENTITIES = """
+    SELECT rowid % 2, rowid / 2, name, alt_name, country, code, bm25(search_index) AS score
+    FROM search_index
+    WHERE search_index MATCH ?
+    ORDER BY score
+    LIMIT ?
+"""
+
+# Catálogo completo del índice para los textos cortos (la respuesta queda en la caché de resultados)
+_SQL_SEARCH_CATALOG = """
+    SELECT rowid % 2, rowid / 2, name, alt_name, country, code
+    FROM search_index
+"""
+
+_SEARCH_KINDS = {0: "team", 1: "tournament"}
+_SEARCH_COLUMNS = ("kind", "no", "name", "alt_name", "country", "code", "score")
+
+
+@functools.lru_cache(maxsize=65536)
+def _fold(text: Optional[str]) -> str:
+    """Minúsculas y sin diacríticos, como el tokenizer unicode61 (remove_diacritics 2) del índice."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _words(text: Optional[str]) -> List[str]:
+    """Palabras del texto normalizado."""
+    return "".join(c if c.isalnum() else " " for c in _fold(text)).split()
+
+
+def _short_search(text: str, limit: int, cancel_event: threading.Event) -> List[dict]:
+    """Búsqueda de textos de 1-2 caracteres, muy cortos para los trigramas del índice.
+
+    Compara el texto normalizado con el código (exacto y luego como prefijo) y
+    con el inicio de las palabras del nombre, el nombre alternativo y el país.
+    """
+    folded = _fold(text)
+    ranked = []
+    for record in _fixed_records(_SQL_SEARCH_CATALOG, (), _SEARCH_COLUMNS[:-1], cancel_event,
+                                 catalog_only=True):
+        code = _fold(record["code"])
+        if code == folded:
+            rank = 0
+        elif code.startswith(folded):
+            rank = 1
+        elif any(w.startswith(folded) for w in _words(record["name"]) + _words(record["alt_name"])):
+            rank = 2
+        elif any(w.startswith(folded) for w in _words(record["country"])):
+            rank = 3
+        else:
+            continue
+        record["kind"] = _SEARCH_KINDS[record["kind"]]
+        record["score"] = None
+        ranked.append((rank, record["kind"], record["name"] or "", record["no"], record))
+    ranked.sort(key=lambda entry: entry[:4])
+    return [entry[-1] for entry in ranked[:limit]]
+
+
+@_tool()
+async def search_entities(text: str, limit: int = 10) -> List[dict]:
+    """
+    Busca equipos y torneos por nombre, nombre traducido, país o código (búsqueda ranqueada).
+
+    Usa esta herramienta para obtener el número (`no`) de un equipo o torneo
+    antes de filtrar en otras queries, en lugar de usar LIKE.
+
+    Args:
+        text: Texto a buscar (por ejemplo 'colombia' o 'world championship'). Con menos de
+            3 caracteres (por ejemplo 'us') se buscan códigos que empiecen así y palabras del
+            nombre o del país, sin distinguir mayúsculas ni acentos (`score` es None).
+        limit: Máximo de resultados.
+
+    Returns:
+        Una lista de coincidencias ordenada por relevancia, con `kind` ('team' o 'tournament') y `no`.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if len(text) < 3:
+        return await _run_in_worker(_short_search, text, max(1, min(limit, 100)))
+    phrase = '"' + text.replace('"', '""') + '"'
+    results = await _run_fixed_query(_SQL_SEARCH_ENTITIES, (phrase, max(1, min(limit, 100))),
+                                     _SEARCH_COLUMNS, catalog_only=True)
+    for result in results:
+        result["kind"] = _SEARCH_KINDS[result["kind"]]
+    return results
+
+
+# Queries fijas de las herramientas con parámetros de ejemplo: warm_up las
+# prepara en cada conexión del pool al arrancar
+_WARMUP_STATEMENTS = (
+    (_SQL_MATCHES_BY_TEAM, ("", "1900-01-01", "2100-12-31")),
+    (_SQL_TOURNAMENT_SCHEDULE, (0,)),
+    (_SQL_MATCH_SETS, (0,)),
+    (_SQL_TEAM_LOOKUP, ("",)),
+    (_SQL_SEARCH_ENTITIES, ('"warm"', 1)),
+    (_SQL_SEARCH_CATALOG, ()),
+    (_SQL_TEAM_RECORD, ("",)),
+    (_SQL_TEAM_RECORD_SEASON, ("", 0)),
+    (_SQL_HEAD_TO_HEAD, ("", "")),
+    (_SQL_POOL_STANDINGS, (0,)),
+    (_SQL_POOL_STANDINGS_POOL, (0, "")),
+)
+
+# Resultado del último warm-up (se muestra en server_stats)
+_warm_up_report: Optional[dict] = None
+
+
+def warm_up_server() -> Optional[dict]:
+    """Precarga las páginas de la BD y las sentencias de las herramientas.
+
+    Prepara tantas conexiones como hilos de query. Si la BD todavía no existe,
+    el servidor arranca igual: el pool se crea en la primera llamada posterior
+    al ETL (ver `get_pool`).
+    """
+    global _warm_up_report
+    try:
+        _warm_up_report = warm_up(_WARMUP_STATEMENTS, connections=_query_workers)
+    except (FileNotFoundError, ValueError, sqlite3.Error) as e:
+        logger.warning("Warm-up omitido: %s", e)
+        return None
+    logger.info("Warm-up: %s", _warm_up_report)
+    return _warm_up_report
+
+
+def configure_server(query_workers: Optional[int] = None, client_concurrency: Optional[int] = None):
+    """Ajusta los hilos de query y el límite de llamadas en curso por cliente."""
+    global _query_workers, _query_executor, _client_limiter
+    if query_workers:
+        previous = _query_executor
+        _query_workers = query_workers
+        _query_executor = ThreadPoolExecutor(max_workers=query_workers, thread_name_prefix="query")
+        previous.shutdown(wait=False)
+    if client_concurrency:
+        _client_limiter = _ClientLimiter(client_concurrency)
+
+
+@mcp.tool()
+def server_stats() -> dict:
+    """
+    Métricas del servidor: latencias por query y por herramienta, queries lentas, caché y pool.
+
+    Returns:
+        Un diccionario con histogramas de latencia (global, por huella de SQL y por
+        herramienta), bytes de respuesta, las últimas queries lentas con su plan, y
+        estadísticas de la caché de resultados, del pool de conexiones, de los cursores
+        paginados, del límite por cliente y del warm-up.
+    """
+    stats = get_query_stats().snapshot()
+    try:
+        stats["cache"] = get_query_cache().stats()
+        stats["pool"] = get_pool().stats()
+        stats["cursors"] = get_paged_queries().stats()
+    except FileNotFoundError as e:
+        # Todavía no hay BD: el pool, la caché y los cursores se crean con ella
+        stats["cache"] = stats["pool"] = stats["cursors"] = None
+        stats["database_error"] = str(e)
+    stats["clients"] = _client_limiter.stats()
+    stats["query_workers"] = _query_workers
+    stats["warm_up"] = _warm_up_report
+    return stats
+
+
+def _setup_slow_query_log():
+    """Envía el slow-query log a su archivo (stdout lo usa el transporte stdio)."""
+    if any(isinstance(h, logging.FileHandler) for h in slow_query_logger.handlers):
+        return
+    handler = logging.FileHandler(SLOW_QUERY_LOG, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_query_logger.addHandler(handler)
+    slow_query_logger.propagate = False
+
+
+def _transport_security(allowed_hosts: List[str]) -> TransportSecuritySettings:
+    """Protección contra DNS rebinding que acepta los hosts locales y `allowed_hosts`.
+
+    Cada host se acepta con cualquier puerto en la cabecera Host y en Origin
+    (http y https).
+    """
+    hosts = list(LOCAL_HOSTS) + [host for host in allowed_hosts if host not in LOCAL_HOSTS]
+    return TransportSecuritySettings(
+        enable_dns_rebinding_protection=True,
+        allowed_hosts=[pattern for host in hosts for pattern in (host, f"{host}:*")],
+        allowed_origins=[f"{scheme}://{pattern}" for host in hosts
+                         for scheme in ("http", "https") for pattern in (host, f"{host}:*")],
+    )
+
+
+def _start_server(options: Dict[str, Any]):
+    """Configura el proceso con las opciones de la línea de comandos y precarga la BD."""
+    _setup_slow_query_log()
+    if options.get("db"):
+        configure_database(options["db"])
+    configure_server(options.get("query_workers"), options.get("client_concurrency"))
+    mcp.settings.stateless_http = bool(options.get("stateless"))
+    # FastMCP no activa la protección por su cuenta: sin esto aceptaría cualquier Host
+    mcp.settings.transport_security = _transport_security(options.get("allowed_hosts") or [])
+    if options.get("warm_up", True):
+        warm_up_server()
+
+
+def create_http_app():
+    """App ASGI streamable-http de un worker pre-forked (`uvicorn --factory main:create_http_app`).
+
+    Cada worker tiene su propio pool de conexiones; todos mapean con mmap los
+    mismos archivos de solo lectura, así que comparten las páginas en la caché
+    del sistema operativo. Las opciones llegan en `SERVER_OPTIONS_ENV`.
+    """
+    options = json.loads(os.environ.get(SERVER_OPTIONS_ENV) or "{}")
+    # Las sesiones MCP viven en memoria de cada worker
+    options["stateless"] = True
+    _start_server(options)
+    return mcp.streamable_http_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor MCP de voleibol")
+    parser.add_argument("--transport", choices=("stdio", "streamable-http"), default="stdio")
+    parser.add_argument("--host", default=HTTP_HOST)
+    parser.add_argument("--port", type=int, default=HTTP_PORT)
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Workers pre-forked para streamable-http (implica --stateless)")
+    parser.add_argument("--query-workers", type=int, default=QUERY_WORKERS,
+                        help="Hilos de query por proceso")
+    parser.add_argument("--client-concurrency", type=int, default=CLIENT_MAX_CONCURRENCY,
+                        help="Herramientas en curso por cliente en cada proceso")
+    parser.add_argument("--allowed-host", action="append", default=[], dest="allowed_hosts",
+                        help="Host (cabecera Host/Origin) aceptado además de los locales; repetible")
+    parser.add_argument("--stateless", action="store_true",
+                        help="Sin sesiones MCP: cada request HTTP es independiente")
+    parser.add_argument("--db", help="Archivo .db o manifest.json de la BD (por defecto ETL/)")
+    parser.add_argument("--no-warm-up", action="store_true", help="No precargar la BD al arrancar")
+    args = parser.parse_args()
+    if (args.transport == "streamable-http" and args.host not in LOCAL_HOSTS + ("::1",)
+            and not args.allowed_hosts):
+        parser.error(f"--host {args.host} requiere --allowed-host con el nombre con el que los "
+                     "clientes acceden al servidor (protección contra DNS rebinding)")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    options = {
+        "db": str(Path(args.db).resolve()) if args.db else None,
+        "query_workers": args.query_workers,
+        "client_concurrency": args.client_concurrency,
+        "stateless": args.stateless,
+        "warm_up": not args.no_warm_up,
+        "allowed_hosts": args.allowed_hosts,
+    }
+
+    if args.transport == "stdio":
+        _start_server(options)
+        mcp.run(transport="stdio")
+        return
+
+    if args.processes > 1:
+        import uvicorn
+
+        os.environ[SERVER_OPTIONS_ENV] = json.dumps(options)
+        uvicorn.run("main:create_http_app", factory=True, host=args.host, port=args.port,
+                    workers=args.processes, app_dir=str(Path(__file__).resolve().parent))
+        return
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    _start_server(options)
+    mcp.run(transport="streamable-http")
+
 
 if __name__ == "__main__":
-    # Initialize and run the server
-    mcp.run(transport='stdio')
\ No newline at end of file
+    main()
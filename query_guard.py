@@ -0,0 +1,362 @@
+"""Validación previa de queries usando EXPLAIN QUERY PLAN."""
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Presupuestos del guard (filas estimadas que SQLite tendría que recorrer)
+COST_BUDGET = 5_000_000
+SCAN_ROWS_THRESHOLD = 10_000
+ROW_LIMIT_BUDGET = 5_000
+
+# Filas estimadas por clave cuando no hay estadísticas de un índice
+DEFAULT_ROWS_PER_KEY = 10
+# Fracción de filas (1/N) que se estima que pasa un WHERE/HAVING sin índice
+FILTER_SELECTIVITY = 4
+
+_SUBQUERY_MARKERS = (
+    "CORRELATED", "SCALAR SUBQUERY", "LIST SUBQUERY", "MATERIALIZE", "CO-ROUTINE", "COMPOUND",
+)
+# Ramas de un UNION/EXCEPT/INTERSECT: se ejecutan una después de otra, así que sus costos se suman
+_BRANCH_MARKERS = ("LEFT-MOST SUBQUERY", "UNION ALL", "UNION USING", "INTERSECT USING", "EXCEPT USING")
+_MERGE_BRANCHES = ("LEFT", "RIGHT")
+_LOOP_RE = re.compile(
+    r"^(SCAN|SEARCH) (\S+)(?: USING (?:(COVERING) )?INDEX (\w+)| USING (INTEGER PRIMARY KEY))?"
+)
+_TABLE_REF_RE = re.compile(
+    r"(?:\bfrom|\bjoin|,)\s+([A-Za-z_]\w*)(?:\s+(?:as\s+)?([A-Za-z_]\w*))?", re.IGNORECASE
+)
+_TRAILING_LIMIT_RE = re.compile(
+    r"\blimit\s+(\d+)(\s+offset\s+\d+)?\s*;?\s*$", re.IGNORECASE
+)
+# Con agregados el LIMIT acota las filas del resultado, no las recorridas
+_AGGREGATE_RE = re.compile(r"\b(?:count|sum|avg|min|max|total|group_concat)\s*\(", re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_PARENS_RE = re.compile(r"\([^()]*\)")
+_FILTER_RE = re.compile(r"\b(?:where|having)\b", re.IGNORECASE)
+_JOIN_CONDITION_RE = re.compile(r"\b(?:on|using)\b", re.IGNORECASE)
+_GROUPING_RE = re.compile(r"\bgroup\s+by\b|\bdistinct\b", re.IGNORECASE)
+_VIEW_TABLE_RE = re.compile(r"\b(?:from|join)\s+(?:(\w+)\.)?(\w+)", re.IGNORECASE)
+_SQL_KEYWORDS = {
+    "where", "join", "inner", "left", "right", "cross", "natural", "on", "using", "group",
+    "order", "limit", "union", "except", "intersect", "having", "window", "full", "outer",
+}
+
+
+class QueryCostError(ValueError):
+    """La query excede el presupuesto de costo del servidor."""
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str,
+                       params: Tuple[Any, ...] = ()) -> List[Tuple[int, int, str]]:
+    """Devuelve el plan de la query como (id, parent, detalle)."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [(row[0], row[1], row[3]) for row in rows]
+
+
+def _alias_map(conn: sqlite3.Connection, sql: str) -> Dict[str, str]:
+    """Mapea alias de tablas a nombres de tablas a partir de FROM/JOIN y listas con comas."""
+    tables = {row[0].lower() for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view')"
+    )}
+    aliases = {}
+    for table, alias in _TABLE_REF_RE.findall(sql):
+        if table.lower() not in tables:
+            continue
+        aliases[table.lower()] = table.lower()
+        if alias and alias.lower() not in _SQL_KEYWORDS:
+            aliases[alias.lower()] = table.lower()
+    return aliases
+
+
+def _table_stats(conn: sqlite3.Connection) -> Dict[str, Dict[Optional[str], List[int]]]:
+    """Lee sqlite_stat1 de cada BD adjunta: {tabla: {índice: [filas, filas_por_clave...]}}.
+
+    Las tablas de BDs adjuntas (shards) llevan el prefijo `esquema.`, como en el plan.
+    """
+    stats: Dict[str, Dict[Optional[str], List[int]]] = {}
+    for _, schema, _ in conn.execute("PRAGMA database_list").fetchall():
+        if schema == "temp":
+            continue
+        prefix = "" if schema == "main" else f"{schema.lower()}."
+        try:
+            rows = conn.execute(f'SELECT tbl, idx, stat FROM "{schema}".sqlite_stat1').fetchall()
+        except sqlite3.OperationalError:
+            continue
+        for tbl, idx, stat in rows:
+            try:
+                numbers = [int(n) for n in stat.split() if n.isdigit()]
+            except (AttributeError, ValueError):
+                continue
+            if numbers:
+                stats.setdefault(prefix + tbl.lower(), {})[idx.lower() if idx else None] = numbers
+    return stats
+
+
+def _table_rows(conn: sqlite3.Connection, stats: Dict, table: str) -> int:
+    """Filas estimadas de una tabla (sqlite_stat1 o COUNT(*) como respaldo)."""
+    table_stats = stats.get(table)
+    if table_stats:
+        return max(numbers[0] for numbers in table_stats.values())
+    quoted = ".".join(f'"{part}"' for part in table.split(".", 1))
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {quoted}").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
+
+
+def _split_table(table: str) -> Tuple[Optional[str], str]:
+    """Separa `esquema.tabla` (tablas de BDs adjuntas) en (esquema, tabla)."""
+    schema, _, name = table.rpartition(".")
+    return schema or None, name
+
+
+def _view_tables(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Tablas que lee una vista (por ejemplo las de cada shard), o [] si no es una vista."""
+    schema, name = _split_table(table)
+    masters = [f'"{schema}".sqlite_master'] if schema else ["sqlite_temp_master", "sqlite_master"]
+    for master in masters:
+        try:
+            row = conn.execute(f"SELECT sql FROM {master} WHERE type = 'view' AND name = ? COLLATE NOCASE",
+                               (name,)).fetchone()
+        except sqlite3.OperationalError:
+            continue
+        if row:
+            sql = _STRING_RE.sub("''", row[0] or "")
+            return [f"{ref_schema}.{ref}" if ref_schema else ref
+                    for ref_schema, ref in _VIEW_TABLE_RE.findall(sql)]
+    return []
+
+
+def indexed_columns(conn: sqlite3.Connection, table: str) -> List[Tuple[str, str]]:
+    """Devuelve (índice, columna principal) de los índices de una tabla.
+
+    `table` puede llevar el esquema de una BD adjunta (`shard_2025.matches`);
+    en una vista se usan los índices de la primera tabla que lee.
+    """
+    view_tables = _view_tables(conn, table)
+    if view_tables:
+        return indexed_columns(conn, view_tables[0])
+    schema, name = _split_table(table)
+    prefix = f'"{schema}".' if schema else ""
+    result = []
+    try:
+        indexes = conn.execute(f'PRAGMA {prefix}index_list("{name}")').fetchall()
+    except sqlite3.OperationalError:
+        return result
+    for index in indexes:
+        index_name = index[1]
+        if index_name.startswith("sqlite_autoindex"):
+            continue
+        info = conn.execute(f'PRAGMA {prefix}index_info("{index_name}")').fetchall()
+        if info:
+            result.append((index_name, info[0][2]))
+    return result
+
+
+def _display_table(conn: sqlite3.Connection, table: str) -> str:
+    """Nombre de la tabla como la ve el usuario: la tabla de un shard se muestra como su vista."""
+    schema, name = _split_table(table)
+    if schema and _view_tables(conn, name):
+        return name
+    return table
+
+
+def _loop_cost(conn: sqlite3.Connection, stats: Dict, table: str, kind: str,
+               index: Optional[str], rowid: bool, detail: str) -> int:
+    """Filas estimadas que recorre un loop del plan."""
+    rows = _table_rows(conn, stats, table)
+    if kind == "SCAN":
+        return max(rows, 1)
+    if rowid:
+        return 1 if "=" in detail else max(rows // 4, 1)
+    numbers = stats.get(table, {}).get(index.lower()) if index else None
+    if "=" not in detail:
+        return max(rows // 4, 1)
+    if numbers and len(numbers) > 1:
+        return max(numbers[1], 1)
+    return DEFAULT_ROWS_PER_KEY
+
+
+def _trailing_limit(sql: str) -> Optional[Tuple[int, int]]:
+    """(LIMIT, OFFSET) finales de la query principal, o None si no tiene."""
+    match = _TRAILING_LIMIT_RE.search(sql)
+    if not match:
+        return None
+    offset = int(match.group(2).split()[-1]) if match.group(2) else 0
+    return int(match.group(1)), offset
+
+
+def _top_level_sql(sql: str) -> str:
+    """La query principal sin comentarios, strings ni subqueries (todo lo que va entre paréntesis)."""
+    text = _COMMENT_RE.sub(" ", _STRING_RE.sub("''", sql))
+    while True:
+        stripped = _PARENS_RE.sub("[]", text)
+        if stripped == text:
+            return text.replace("[]", "()")
+        text = stripped
+
+
+def analyze_query(conn: sqlite3.Connection, sql: str,
+                  params: Tuple[Any, ...] = ()) -> Dict[str, Any]:
+    """Analiza el plan de una query: costo estimado, filas del resultado y scans completos.
+
+    Con un LIMIT final, el loop externo de la query principal se corta tras
+    LIMIT + OFFSET filas, salvo que el plan ordene o agrupe en un B-tree
+    temporal, la query use agregados o filtre filas (WHERE, HAVING o un JOIN
+    resuelto con un scan): entonces puede recorrer todo sin llegar al LIMIT.
+
+    `estimated_rows` es una cota de las filas del resultado (None si la query
+    agrupa y no se puede estimar): el producto de los loops de la query
+    principal, o la suma de las ramas de un UNION, dividido por
+    `FILTER_SELECTIVITY` si hay un filtro y acotado por el LIMIT.
+    """
+    plan = explain_query_plan(conn, sql, params)
+    aliases = _alias_map(conn, sql)
+    stats = _table_stats(conn)
+    parents = {node_id: (parent, detail) for node_id, parent, detail in plan}
+    top_level = _top_level_sql(sql)
+    filtered = bool(_FILTER_RE.search(top_level))
+    limit = _trailing_limit(sql)
+
+    def _group(node_id: int) -> Tuple[int, bool]:
+        """Subquery o rama a la que pertenece un loop (0 = query principal) y si es correlacionada."""
+        group = None
+        parent = parents[node_id][0]
+        while parent in parents:
+            detail = parents[parent][1]
+            if detail.startswith(_SUBQUERY_MARKERS):
+                return (group if group is not None else parent), detail.startswith("CORRELATED")
+            if group is None and (detail.startswith(_BRANCH_MARKERS) or detail in _MERGE_BRANCHES):
+                group = parent
+            parent = parents[parent][0]
+        return (group if group is not None else 0), False
+
+    def _top_level_branch(node_id: int) -> bool:
+        """Si la rama es parte del UNION de la query principal (sus filas van al resultado)."""
+        parent = parents[node_id][0]
+        while parent in parents:
+            detail = parents[parent][1]
+            if not (detail.startswith(("COMPOUND QUERY", "MERGE") + _BRANCH_MARKERS)
+                    or detail in _MERGE_BRANCHES):
+                return False
+            parent = parents[parent][0]
+        return True
+
+    # Un SCAN de un co-routine o subquery materializada lee sus filas, no una tabla
+    subqueries = {detail.split(" ", 1)[1].lower() for _, _, detail in plan
+                  if detail.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+    loops = []
+    full_scans = []
+    for node_id, _, detail in plan:
+        match = _LOOP_RE.match(detail)
+        if not match:
+            continue
+        kind, name, _covering, index, rowid = match.groups()
+        table = aliases.get(name.lower(), name.lower())
+        if table.startswith("("):
+            continue
+        cost = _loop_cost(conn, stats, table, kind, index, bool(rowid), detail)
+        if kind == "SCAN" and name.lower() not in subqueries:
+            full_scans.append({"table": table, "rows": cost, "detail": detail})
+        loops.append((kind, cost) + _group(node_id))
+
+    # Un JOIN cuyo loop interno es un scan filtra filas con su condición (ON/USING)
+    main_loops = [kind for kind, _, group, _ in loops if group == 0]
+    if _JOIN_CONDITION_RE.search(top_level) and "SCAN" in main_loops[1:]:
+        filtered = True
+    row_limit = None
+    if limit is not None and not filtered and not _AGGREGATE_RE.search(sql) and not any(
+        parent == 0 and detail.startswith("USE TEMP B-TREE") for _, parent, detail in plan
+    ):
+        row_limit = max(sum(limit), 1)
+
+    groups: Dict[int, Tuple[int, bool]] = {}
+    output: Dict[int, int] = {}
+    for kind, cost, group, correlated in loops:
+        output[group] = output.get(group, 1) * cost
+        if group == 0 and group not in groups and row_limit is not None:
+            cost = min(cost, row_limit)
+        previous = groups.get(group, (1, correlated))[0]
+        groups[group] = (previous * cost, correlated)
+
+    main_cost = groups.pop(0, (1, False))[0]
+    total = main_cost
+    for cost, correlated in groups.values():
+        total += main_cost * cost if correlated else cost
+
+    if _GROUPING_RE.search(top_level):
+        estimated_rows = None
+    elif _AGGREGATE_RE.search(top_level):
+        estimated_rows = 1
+    else:
+        branches = [rows for group, rows in output.items() if group != 0 and _top_level_branch(group)]
+        estimated_rows = sum(branches) if branches and 0 not in output else output.get(0, 1)
+        if filtered:
+            estimated_rows = max(estimated_rows // FILTER_SELECTIVITY, 1)
+        if limit is not None:
+            estimated_rows = min(estimated_rows, limit[0])
+
+    return {
+        "plan": [detail for _, _, detail in plan],
+        "estimated_cost": total,
+        "estimated_rows": estimated_rows,
+        "full_scans": full_scans,
+        "row_limit": row_limit,
+    }
+
+
+def _suggestion(conn: sqlite3.Connection, table: str) -> str:
+    """Sugiere las columnas indexadas de una tabla (o de las tablas de una vista)."""
+    columns = [f"{column} ({name})" for name, column in indexed_columns(conn, table)]
+    if not columns:
+        return f"La tabla {table} no tiene índices; filtra por su clave primaria."
+    return f"Filtra {table} por una columna indexada: {', '.join(columns)}."
+
+
+def check_query(conn: sqlite3.Connection, sql: str, params: Tuple[Any, ...] = (),
+                cost_budget: int = COST_BUDGET, limit_budget: Optional[int] = ROW_LIMIT_BUDGET,
+                scan_rows_threshold: int = SCAN_ROWS_THRESHOLD) -> Tuple[str, Dict[str, Any]]:
+    """Valida una query antes de ejecutarla.
+
+    Args:
+        limit_budget: Máximo de filas estimadas del resultado (`estimated_rows`);
+            None lo omite (las queries paginadas ya acotan cada respuesta con
+            `page_size`).
+
+    Returns:
+        La query a ejecutar y el análisis del plan, con `warnings` sobre los
+        scans completos de tablas grandes.
+
+    Raises:
+        QueryCostError: Si el costo estimado supera `cost_budget` o las filas
+            estimadas del resultado superan `limit_budget`.
+    """
+    report = analyze_query(conn, sql, params)
+
+    # Scans completos por tabla; las tablas de cada shard se suman en su vista
+    scanned: Dict[str, Dict[str, int]] = {}
+    for scan in report["full_scans"]:
+        tables = scanned.setdefault(_display_table(conn, scan["table"]), {})
+        tables[scan["table"]] = max(tables.get(scan["table"], 0), scan["rows"])
+    warnings = [
+        f"Scan completo de {table} (~{sum(tables.values())} filas). {_suggestion(conn, table)}"
+        for table, tables in scanned.items() if sum(tables.values()) > scan_rows_threshold
+    ]
+    report["warnings"] = warnings
+
+    if report["estimated_cost"] > cost_budget:
+        details = " ".join(warnings) or "Agrega filtros sobre columnas indexadas."
+        raise QueryCostError(
+            f"Query rechazada: costo estimado de ~{report['estimated_cost']} filas recorridas "
+            f"(máximo {cost_budget}). {details}"
+        )
+    rows = report["estimated_rows"]
+    if limit_budget is not None and rows is not None and rows > limit_budget:
+        raise QueryCostError(
+            f"Query rechazada: devolvería ~{rows} filas (máximo {limit_budget} por respuesta). "
+            "Agrega filtros o un LIMIT menor, o usa execute_query con page_size para recorrer "
+            "el resultado por páginas."
+        )
+    return sql, report
@@ -0,0 +1,169 @@
+"""Métricas de latencia, filas y bytes por query y por herramienta, y log de queries lentas."""
+import functools
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Límites superiores (ms) de los buckets del histograma de latencias
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Queries más lentas que esto van al slow-query log
+SLOW_QUERY_MS = 500.0
+SLOW_LOG_SIZE = 50
+MAX_FINGERPRINTS = 500
+
+slow_query_logger = logging.getLogger("mcp_voleyball.slow_queries")
+
+_LITERALS_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint_sql(normalized_sql: str) -> Tuple[str, str]:
+    """Huella de una query normalizada y su forma, con los literales reemplazados por `?`."""
+    shape = _IN_LIST_RE.sub("(?)", _LITERALS_RE.sub("?", normalized_sql))
+    return hashlib.sha1(shape.encode("utf-8")).hexdigest()[:12], shape
+
+
+class _Histogram:
+    """Histograma de latencias con buckets fijos."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        index = 0
+        while index < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Límite superior del bucket que contiene el percentil."""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {
+                (f"<={bound}" if i < len(LATENCY_BUCKETS_MS) else f">{LATENCY_BUCKETS_MS[-1]}"): count
+                for i, (bound, count) in enumerate(zip(LATENCY_BUCKETS_MS + (None,), self.counts))
+                if count
+            },
+        }
+
+
+class QueryStats:
+    """Acumula métricas del hot path de forma thread-safe."""
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self._queries = _Histogram()
+        self._fingerprints: Dict[str, Dict[str, Any]] = {}
+        self._tools: Dict[str, Dict[str, Any]] = {}
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+
+    def record_query(self, normalized_sql: str, seconds: float, rows: int, cached: bool,
+                     error: Optional[BaseException] = None,
+                     plan_provider: Optional[Callable[[], List[str]]] = None):
+        """Registra una ejecución de run_query."""
+        ms = seconds * 1000
+        key, shape = fingerprint_sql(normalized_sql)
+        with self._lock:
+            self._queries.add(ms)
+            entry = self._fingerprints.get(key)
+            if entry is None:
+                if len(self._fingerprints) >= MAX_FINGERPRINTS:
+                    # Descarta la huella menos costosa para acotar la memoria
+                    cheapest = min(self._fingerprints, key=lambda k: self._fingerprints[k]["latency"].total_ms)
+                    del self._fingerprints[cheapest]
+                entry = self._fingerprints[key] = {
+                    "sql": shape[:500], "latency": _Histogram(), "rows": 0, "cache_hits": 0, "errors": 0,
+                }
+            entry["latency"].add(ms)
+            entry["rows"] += rows
+            entry["cache_hits"] += int(cached)
+            entry["errors"] += int(error is not None)
+
+        if ms >= self.slow_query_ms and not cached:
+            plan = None
+            if plan_provider is not None:
+                try:
+                    plan = plan_provider()
+                except Exception as e:
+                    plan = [f"(sin plan: {e})"]
+            record = {
+                "at": time.time(), "fingerprint": key, "ms": round(ms, 3), "rows": rows,
+                "sql": normalized_sql[:2000], "plan": plan,
+                "error": f"{type(error).__name__}: {error}" if error else None,
+            }
+            with self._lock:
+                self._slow.append(record)
+            slow_query_logger.warning("Query lenta (%.1f ms, %d filas) [%s]: %s | plan: %s",
+                                      ms, rows, key, record["sql"], plan)
+
+    def record_tool(self, name: str, seconds: float, response_bytes: int,
+                    error: Optional[BaseException] = None):
+        """Registra una llamada a una herramienta MCP."""
+        with self._lock:
+            entry = self._tools.get(name)
+            if entry is None:
+                entry = self._tools[name] = {"latency": _Histogram(), "response_bytes": 0,
+                                             "max_response_bytes": 0, "errors": 0}
+            entry["latency"].add(seconds * 1000)
+            entry["response_bytes"] += response_bytes
+            entry["max_response_bytes"] = max(entry["max_response_bytes"], response_bytes)
+            entry["errors"] += int(error is not None)
+
+    def snapshot(self, top: int = 20) -> Dict[str, Any]:
+        """Agregados actuales: latencias globales, por huella y por herramienta, y queries lentas."""
+        with self._lock:
+            fingerprints = sorted(self._fingerprints.items(),
+                                  key=lambda item: item[1]["latency"].total_ms, reverse=True)[:top]
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "queries": self._queries.to_dict(),
+                "top_fingerprints": [
+                    {"fingerprint": key, "sql": entry["sql"], "latency": entry["latency"].to_dict(),
+                     "rows": entry["rows"], "cache_hits": entry["cache_hits"], "errors": entry["errors"]}
+                    for key, entry in fingerprints
+                ],
+                "tools": {
+                    name: {"latency": entry["latency"].to_dict(), "response_bytes": entry["response_bytes"],
+                           "max_response_bytes": entry["max_response_bytes"], "errors": entry["errors"]}
+                    for name, entry in self._tools.items()
+                },
+                "slow_queries": list(self._slow),
+            }
+
+
+_stats = QueryStats()
+
+
+def get_query_stats() -> QueryStats:
+    """Obtiene las métricas compartidas del proceso."""
+    return _stats
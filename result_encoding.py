@@ -0,0 +1,125 @@
+"""Formatos compactos de respuesta para execute_query y recorte por presupuesto de bytes."""
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+FORMATS = ("tuples", "rows", "columnar")
+# Presupuesto por respuesta cuando se pide un formato con nombres de columnas
+DEFAULT_MAX_RESPONSE_BYTES = 256 * 1024
+# Una columna de texto se codifica con diccionario si sus valores distintos
+# son a lo sumo esta fracción de las filas
+DICTIONARY_MAX_RATIO = 0.5
+# Iteraciones máximas para ajustar cuántas filas caben en el presupuesto
+BUDGET_SEARCH_STEPS = 12
+
+
+def _json_size(value: Any) -> int:
+    """Bytes de `value` serializado en JSON compacto."""
+    return len(json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _encode_column(values: List[Any]) -> Any:
+    """Codifica una columna: constante, diccionario o lista de valores."""
+    if not values:
+        return []
+    first = values[0]
+    if all(v == first for v in values):
+        return {"const": first}
+    strings = [v for v in values if isinstance(v, str)]
+    if len(strings) == len(values):
+        dictionary: Dict[str, int] = {}
+        codes = [dictionary.setdefault(v, len(dictionary)) for v in values]
+        if len(dictionary) <= DICTIONARY_MAX_RATIO * len(values):
+            return {"dict": list(dictionary), "codes": codes}
+    return values
+
+
+def encode_columnar(columns: Sequence[str], rows: List[Tuple]) -> Dict[str, Any]:
+    """Resultado por columnas: los valores de cada columna van juntos.
+
+    Una columna con un único valor se envía como `{"const": valor}` y una de
+    textos repetidos como `{"dict": [valores], "codes": [índices]}`.
+    """
+    data = {}
+    for index, column in enumerate(columns):
+        data[column] = _encode_column([row[index] for row in rows])
+    return {"format": "columnar", "columns": list(columns), "row_count": len(rows), "data": data}
+
+
+def encode_rows(columns: Sequence[str], rows: List[Tuple]) -> Dict[str, Any]:
+    """Resultado por filas con los nombres de columnas una sola vez."""
+    return {"format": "rows", "columns": list(columns), "rows": [list(row) for row in rows]}
+
+
+_ENCODERS = {"rows": encode_rows, "columnar": encode_columnar}
+
+
+def validate_format(fmt: str) -> str:
+    """Normaliza el nombre del formato o lanza ValueError."""
+    fmt = (fmt or "tuples").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato desconocido '{fmt}'. Usa uno de: {', '.join(FORMATS)}.")
+    return fmt
+
+
+def encode_result(columns: Sequence[str], rows: List[Tuple], fmt: str,
+                  max_bytes: Optional[int] = None, offset: int = 0) -> Dict[str, Any]:
+    """Codifica `rows[offset:]` en `fmt` sin superar `max_bytes`.
+
+    Si no caben todas las filas, el resultado se corta en una fila completa y
+    lleva `truncated` y `next_offset` para pedir el resto (la query repetida
+    sale de la caché de resultados); siempre se incluye al menos una fila.
+    """
+    return encode_result_sized(columns, rows, fmt, max_bytes, offset)[0]
+
+
+def encode_result_sized(columns: Sequence[str], rows: List[Tuple], fmt: str,
+                        max_bytes: Optional[int] = None,
+                        offset: int = 0) -> Tuple[Dict[str, Any], Optional[int]]:
+    """Igual que `encode_result`, pero devuelve también los bytes JSON del resultado.
+
+    El tamaño sale de las mediciones hechas para ajustar el presupuesto, sin
+    volver a serializar; sin `max_bytes` no se mide y es None.
+    """
+    encoder = _ENCODERS[fmt]
+    remaining = rows[offset:]
+    if not max_bytes:
+        result = encoder(columns, remaining)
+        result["next_offset"] = None
+        result["truncated"] = False
+        return result, None
+
+    # Primera estimación por filas serializadas; después se ajusta con el
+    # tamaño real codificado (el formato por columnas suele ocupar menos)
+    budget = max_bytes - _json_size(list(columns)) - 128
+    count = used = 0
+    for row in remaining:
+        used += _json_size(row) + 1
+        if used > budget and count:
+            break
+        count += 1
+
+    fits, too_big = 0, len(remaining) + 1
+    best = best_size = None
+    for _ in range(BUDGET_SEARCH_STEPS):
+        result = encoder(columns, remaining[:count])
+        size = _json_size(result)
+        if size <= max_bytes or count <= 1:
+            fits, best, best_size = count, result, size
+            if count == len(remaining):
+                break
+        else:
+            too_big = count
+        if too_big - fits <= max(1, fits // 50):
+            break
+        guess = int(count * max_bytes / size * 0.97)
+        count = guess if fits < guess < too_big else (fits + too_big) // 2
+    if best is None:
+        best = encoder(columns, remaining[:1])
+        best_size = _json_size(best)
+        fits = min(1, len(remaining))
+    tail = {"next_offset": offset + fits if fits < len(remaining) else None}
+    tail["truncated"] = tail["next_offset"] is not None
+    best.update(tail)
+    # Las claves agregadas ocupan lo mismo que en su propio objeto, sin llaves y con una coma
+    return best, best_size + _json_size(tail) - 1
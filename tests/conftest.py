@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Los módulos del ETL se importan entre sí como módulos de primer nivel
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "ETL"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def volleyball_db(tmp_path_factory):
+    """BD pequeña generada con el dataset sintético de los benchmarks."""
+    from database_converter import VolleyballDBConverter
+    from generate_dataset import write_dataset
+
+    base = tmp_path_factory.mktemp("volleyball")
+    write_dataset(str(base / "matches.json"), matches=400, seasons=2, tournaments_per_season=2)
+    db_path = base / "volleyball_data.db"
+    VolleyballDBConverter(str(db_path)).convert_json_to_db(str(base / "matches.json"))
+    return db_path
+
+
+@pytest.fixture
+def server_db(volleyball_db):
+    """Apunta el servidor (db_connection) a la BD de prueba."""
+    import db_connection
+
+    db_connection.configure_database(volleyball_db)
+    return volleyball_db
@@ -0,0 +1,61 @@
+"""Equivalencia entre la carga completa, la carga por streaming y la sincronización incremental."""
+import json
+import sqlite3
+
+import pytest
+
+from database_converter import VolleyballDBConverter
+from generate_dataset import write_dataset
+
+
+TABLES = ("tournaments", "teams", "pools", "rounds", "matches", "sets",
+          "team_season_records", "head_to_head", "pool_standings")
+# El id autoincremental de sets cambia al reemplazar los sets de un partido
+COLUMNS = {"sets": "match_no, set_number, points_team_a, points_team_b"}
+
+
+def _dump(db_path) -> dict:
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            table: sorted(conn.execute(f"SELECT {COLUMNS.get(table, '*')} FROM {table}").fetchall(), key=repr)
+            for table in TABLES
+        }
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "matches.json"
+    write_dataset(str(path), matches=300, seasons=2, tournaments_per_season=2)
+    return path
+
+
+def test_streaming_matches_bulk_load(tmp_path, dataset):
+    bulk = tmp_path / "bulk.db"
+    stream = tmp_path / "stream.db"
+    VolleyballDBConverter(str(bulk)).convert_json_to_db(str(dataset))
+    VolleyballDBConverter(str(stream)).stream_json_to_db(str(dataset))
+    assert _dump(bulk) == _dump(stream)
+
+
+def test_sync_matches_full_rebuild(tmp_path, dataset):
+    synced = tmp_path / "synced.db"
+    VolleyballDBConverter(str(synced)).convert_json_to_db(str(dataset))
+
+    with open(dataset, encoding="utf-8") as f:
+        data = json.load(f)
+    data["matches"][0]["teamAScore"], data["matches"][0]["teamBScore"] = 0, 3
+    data["matches"][0]["winnerTeamNo"] = data["matches"][0]["teamBNo"]
+    data["matches"][1]["city"] = "Cali"
+    changed = tmp_path / "changed.json"
+    changed.write_text(json.dumps(data), encoding="utf-8")
+
+    summary = VolleyballDBConverter(str(synced)).sync_json_to_db(str(changed))
+    assert summary["matches"] == 2
+
+    rebuilt = tmp_path / "rebuilt.db"
+    VolleyballDBConverter(str(rebuilt)).convert_json_to_db(str(changed))
+    assert _dump(synced) == _dump(rebuilt)
+    assert VolleyballDBConverter(str(synced)).sync_json_to_db(str(changed))["matches"] == 0
@@ -0,0 +1,88 @@
+"""Pruebas del lector incremental de JSON del ETL (iter_json_document)."""
+import io
+import json
+
+import pytest
+
+from database_converter import STREAM_CHUNK_SIZE, iter_json_document
+
+
+# Tamaños de bloque que cortan números, strings y escapes en todas las posiciones
+CHUNK_SIZES = (1, 2, 3, 5, 7, 16, STREAM_CHUNK_SIZE)
+
+
+def _collect(text: str, stream_keys=("matches",), chunk_size: int = STREAM_CHUNK_SIZE):
+    return list(iter_json_document(io.StringIO(text), stream_keys=stream_keys, chunk_size=chunk_size))
+
+
+def _expected(document: dict, stream_keys=("matches",)):
+    items = []
+    for key, value in document.items():
+        if key in stream_keys and isinstance(value, list):
+            items.extend((key, element) for element in value)
+        else:
+            items.append((key, value))
+    return items
+
+
+DOCUMENT = {
+    "matches": [
+        {"matchNo": 123456789, "score": -12.5e-3, "big": 98765432109876543210, "ok": True, "tbd": None},
+        {"matchNo": 2, "city": "Bogotá \"Coliseo\" \\ norte", "emoji": "\U0001F3D0", "sets": []},
+        {"matchNo": 3, "nested": {"list": [1, [2, [3]], {}], "empty": ""}},
+    ],
+    "allTeams": [{"no": 10, "code": "COL", "name": "Colombia"}],
+    "allTournaments": [],
+    "count": 1234567,
+}
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_values_split_across_chunks(chunk_size):
+    text = json.dumps(DOCUMENT, ensure_ascii=False)
+    assert _collect(text, chunk_size=chunk_size) == _expected(DOCUMENT)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_compact_and_indented_documents(chunk_size):
+    for text in (json.dumps(DOCUMENT, separators=(",", ":")), json.dumps(DOCUMENT, indent=4)):
+        assert _collect(text, chunk_size=chunk_size) == _expected(DOCUMENT)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_number_at_end_of_chunk_is_not_cut(chunk_size):
+    # El número toca el final de cada bloque: no debe leerse como 1, 12, 123...
+    text = '{"count": 1234567890123}'
+    assert _collect(text, chunk_size=chunk_size) == [("count", 1234567890123)]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_empty_arrays_and_object(chunk_size):
+    assert _collect("{}", chunk_size=chunk_size) == []
+    assert _collect('{"matches": []}', chunk_size=chunk_size) == []
+    assert _collect('{ "matches" : [ ] , "allTeams" : [ ] }', chunk_size=chunk_size) == [("allTeams", [])]
+    assert _collect('{"matches": [], "allTeams": []}', stream_keys=("matches", "allTeams"),
+                    chunk_size=chunk_size) == []
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_matches_after_all_teams(chunk_size):
+    document = {
+        "allTeams": [{"no": 1}, {"no": 2}],
+        "allTournaments": [{"no": 1520}],
+        "matches": [{"matchNo": 1}, {"matchNo": 2}],
+    }
+    stream_keys = ("matches", "allTeams", "allTournaments")
+    text = json.dumps(document)
+    assert _collect(text, stream_keys, chunk_size) == _expected(document, stream_keys)
+
+
+def test_stream_key_that_is_not_a_list_is_emitted_whole():
+    assert _collect('{"matches": null}') == [("matches", None)]
+    assert _collect('{"matches": {"a": 1}}') == [("matches", {"a": 1})]
+
+
+@pytest.mark.parametrize("text", ['{"matches": [1, 2', '{"a": "sin cerrar}', '[1, 2]', '{"a" 1}'])
+def test_invalid_json_raises(text):
+    with pytest.raises(ValueError):
+        _collect(text, chunk_size=3)
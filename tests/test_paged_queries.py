@@ -0,0 +1,47 @@
+"""Pruebas de los cursores paginados (db_connection.PagedQueryRegistry)."""
+import pytest
+
+import db_connection
+from db_connection import PagedQueryRegistry
+
+QUERY = "SELECT match_no FROM matches ORDER BY match_no"
+
+
+@pytest.fixture
+def registry(server_db):
+    registry = PagedQueryRegistry(db_connection.get_pool(), max_open=3, reap_seconds=60)
+    yield registry
+    for token in list(registry._cursors):
+        registry.close(token)
+
+
+def test_fetch_at_max_open_keeps_live_cursors(registry):
+    tokens = [registry.open(QUERY, page_size=10)["cursor"] for _ in range(3)]
+    assert all(tokens)
+
+    # Con el registro lleno, pedir páginas y una vuelta del timer no cierran cursores en uso
+    for token in tokens:
+        page = registry.fetch(token)
+        assert page["cursor"] == token and len(page["rows"]) == 10
+    registry._reap()
+    assert registry.stats()["open"] == 3
+
+
+def test_open_evicts_least_recently_used(registry):
+    first, second, third = (registry.open(QUERY, page_size=10)["cursor"] for _ in range(3))
+    registry.fetch(first)
+
+    fourth = registry.open(QUERY, page_size=10)["cursor"]
+    assert registry.stats()["open"] == 3
+    with pytest.raises(ValueError, match="expirado"):
+        registry.fetch(second)
+    for token in (first, third, fourth):
+        assert registry.fetch(token)["cursor"] == token
+
+
+def test_idle_cursors_expire(registry):
+    token = registry.open(QUERY, page_size=10)["cursor"]
+    registry.idle_seconds = 0
+    registry.expire_idle()
+    with pytest.raises(ValueError, match="expirado"):
+        registry.fetch(token)
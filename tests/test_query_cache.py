@@ -0,0 +1,52 @@
+"""Pruebas de la caché de resultados (db_connection.QueryCache)."""
+import sqlite3
+
+import pytest
+
+from db_connection import QueryCache
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "cache.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _commit(db_path, value):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO t VALUES (?)", (value,))
+    conn.commit()
+    conn.close()
+
+
+def test_put_with_current_signature_is_cached(db_path):
+    cache = QueryCache(db_path)
+    key = cache.make_key("SELECT x FROM t")
+    assert cache.get(key) is None
+    cache.put(key, [(1,)], ["x"], signature=cache.signature())
+    assert cache.get(key) == [(1,)]
+
+
+def test_put_after_concurrent_commit_is_dropped(db_path):
+    cache = QueryCache(db_path)
+    key = cache.make_key("SELECT x FROM t")
+    assert cache.get(key) is None
+    signature = cache.signature()
+    # Otra conexión hace commit mientras la query se ejecuta
+    _commit(db_path, 2)
+    cache.put(key, [(1,)], ["x"], signature=signature)
+    assert cache.get(key) is None
+    assert cache.stats()["stale_puts"] == 1
+
+
+def test_commit_invalidates_cached_result(db_path):
+    cache = QueryCache(db_path)
+    key = cache.make_key("SELECT x FROM t")
+    cache.put(key, [(1,)], ["x"], signature=cache.signature())
+    _commit(db_path, 2)
+    assert cache.get(key) is None
@@ -0,0 +1,101 @@
+"""Pruebas del cost guard (query_guard.check_query) y de sus advertencias en el servidor."""
+import asyncio
+import functools
+import sqlite3
+
+import pytest
+
+import db_connection
+import main
+import query_guard
+from database_converter import shard_json_to_db
+from query_guard import QueryCostError, check_query
+
+
+CARTESIAN = "SELECT * FROM matches a, matches b"
+FILTERED_CARTESIAN = CARTESIAN + " WHERE a.team_a_score + b.team_b_score = 99"
+
+
+@pytest.fixture
+def conn(volleyball_db):
+    conn = sqlite3.connect(volleyball_db)
+    yield conn
+    conn.close()
+
+
+def test_rejects_query_over_cost_budget(conn):
+    # 400 x 400 filas recorridas
+    with pytest.raises(QueryCostError, match="costo estimado"):
+        check_query(conn, CARTESIAN, cost_budget=10_000)
+
+
+def test_limit_caps_cost_of_unfiltered_outer_loop(conn):
+    _, report = check_query(conn, CARTESIAN + " LIMIT 1", cost_budget=10_000)
+    assert report["row_limit"] == 1
+    assert report["estimated_cost"] == 400
+    assert report["estimated_rows"] == 1
+
+
+def test_limit_does_not_cap_filtered_cartesian(conn):
+    # El WHERE puede descartar todas las filas: SQLite recorre el producto entero
+    for sql in (FILTERED_CARTESIAN, FILTERED_CARTESIAN + " LIMIT 1"):
+        with pytest.raises(QueryCostError, match="costo estimado"):
+            check_query(conn, sql, cost_budget=10_000)
+    report = query_guard.analyze_query(conn, FILTERED_CARTESIAN + " LIMIT 1")
+    assert report["row_limit"] is None
+
+
+def test_row_budget_uses_estimated_output_rows(conn):
+    with pytest.raises(QueryCostError, match="devolvería ~400 filas"):
+        check_query(conn, "SELECT * FROM matches", limit_budget=100)
+    with pytest.raises(QueryCostError, match="devolvería ~150 filas"):
+        check_query(conn, "SELECT * FROM matches LIMIT 150", limit_budget=100)
+    # El LIMIT literal no importa si la tabla es chica
+    _, report = check_query(conn, "SELECT * FROM teams LIMIT 6000", limit_budget=100)
+    assert report["estimated_rows"] == 48
+    _, report = check_query(conn, "SELECT COUNT(*) FROM matches", limit_budget=100)
+    assert report["estimated_rows"] == 1
+    _, report = check_query(conn, "SELECT * FROM matches LIMIT 50", limit_budget=100)
+    assert report["estimated_rows"] == 50
+    # Las queries paginadas no tienen presupuesto de filas
+    check_query(conn, "SELECT * FROM matches", limit_budget=None)
+
+
+def test_full_scan_warning_suggests_indexes(conn):
+    _, report = check_query(conn, "SELECT * FROM matches WHERE city = 'Cali'", scan_rows_threshold=100)
+    assert len(report["warnings"]) == 1
+    assert report["warnings"][0].startswith("Scan completo de matches (~400 filas)")
+    assert "idx_matches_tournament" in report["warnings"][0]
+    _, report = check_query(conn, "SELECT * FROM matches WHERE tournament_no = 1", scan_rows_threshold=100)
+    assert report["warnings"] == []
+
+
+def test_warning_on_sharded_view_uses_shard_indexes(volleyball_db, tmp_path):
+    manifest = shard_json_to_db(str(volleyball_db.parent / "matches.json"), str(tmp_path / "shards"))
+    assert len(manifest["shards"]) == 2
+    db_connection.configure_database(tmp_path / "shards" / "manifest.json")
+    try:
+        with db_connection.get_pool().connection() as sharded:
+            _, report = check_query(sharded, "SELECT * FROM matches WHERE city = 'Cali'",
+                                    scan_rows_threshold=100)
+    finally:
+        db_connection.configure_database(volleyball_db)
+    # Una sola advertencia para la vista, con los índices de las tablas de los shards
+    assert len(report["warnings"]) == 1
+    assert report["warnings"][0].startswith("Scan completo de matches (~400 filas)")
+    assert "no tiene índices" not in report["warnings"][0]
+    assert "idx_matches_tournament" in report["warnings"][0]
+
+
+def test_execute_query_returns_warnings(server_db, monkeypatch):
+    monkeypatch.setattr(db_connection, "check_query",
+                        functools.partial(check_query, scan_rows_threshold=100))
+    db_connection.get_query_cache().clear()
+    arguments = {"query": "SELECT match_no FROM matches WHERE city = 'Cali'", "format": "rows"}
+    for _ in range(2):  # La segunda respuesta sale de la caché
+        _, structured = asyncio.run(main.mcp.call_tool("execute_query", arguments))
+        assert structured["result"]["warnings"][0].startswith("Scan completo de matches")
+
+    warnings = []
+    db_connection.run_query("SELECT match_no FROM matches WHERE city = 'Cali'", warnings=warnings)
+    assert len(warnings) == 1
@@ -0,0 +1,58 @@
+"""Pruebas de la división en ventanas de fechas del scraper (sin red)."""
+from datetime import date, timedelta
+
+from scrapper import VolleyballScrapper
+
+
+def _api(matches_per_day: int, cap: int):
+    """Respuesta simulada de la API: `matches_per_day` partidos por día, cortada en `cap`."""
+    def fetch_range(start_date, end_date, tournament_no, endpoint="tournament"):
+        day = date.fromisoformat(start_date)
+        matches = []
+        while day <= date.fromisoformat(end_date):
+            matches += [{"matchNo": day.toordinal() * 100 + i} for i in range(matches_per_day)]
+            day += timedelta(days=1)
+        return {"matches": matches[:cap], "allTeams": [], "allTournaments": [{"no": tournament_no}]}
+    return fetch_range
+
+
+def test_range_split_bisects_windows_at_page_cap(monkeypatch):
+    scrapper = VolleyballScrapper(cache_path=None)
+    monkeypatch.setattr(scrapper, "MAX_MATCHES_PER_RESPONSE", 50)
+    monkeypatch.setattr(scrapper, "_fetch_range", _api(matches_per_day=10, cap=50))
+
+    result = scrapper._fetch_by_range_split("2025-01-01", "2025-01-30", 7)
+    assert len(result["matches"]) == 300
+    assert scrapper.coverage_gaps[7] == []
+
+
+def test_range_split_reports_capped_single_day(monkeypatch):
+    scrapper = VolleyballScrapper(cache_path=None)
+    monkeypatch.setattr(scrapper, "MAX_MATCHES_PER_RESPONSE", 5)
+    monkeypatch.setattr(scrapper, "_fetch_range", _api(matches_per_day=8, cap=5))
+
+    result = scrapper._fetch_by_range_split("2025-01-01", "2025-01-02", 7)
+    assert len(result["matches"]) == 10
+    assert scrapper.coverage_gaps[7] == [("2025-01-01", "2025-01-01"), ("2025-01-02", "2025-01-02")]
+
+
+def test_full_tournament_splits_capped_response(monkeypatch):
+    scrapper = VolleyballScrapper(cache_path=None)
+    monkeypatch.setattr(scrapper, "MAX_MATCHES_PER_RESPONSE", 50)
+    monkeypatch.setattr(scrapper, "_fetch_range", _api(matches_per_day=10, cap=50))
+    monkeypatch.setattr(scrapper, "_fetch_competition_info", lambda tournament_no, year: {
+        "startDate": "2025-03-01T00:00:00", "endDate": "2025-03-20T00:00:00",
+    })
+
+    result = scrapper.fetch_full_tournament(7, year=2025)
+    assert len(result["matches"]) == 200
+
+
+def test_http_pool_covers_nested_workers(monkeypatch):
+    scrapper = VolleyballScrapper(pool_size=4, cache_path=None)
+    monkeypatch.setattr(scrapper, "fetch_full_tournament", lambda tournament_no, year=None: {})
+    scrapper.fetch_tournaments(range(20), max_workers=8)
+    # 8 torneos en paralelo, cada uno con hasta WINDOW_WORKERS ventanas a la vez
+    expected = 8 * VolleyballScrapper.WINDOW_WORKERS
+    assert scrapper.pool_size == expected
+    assert scrapper.session.get_adapter("https://en.volleyballworld.com")._pool_maxsize == expected
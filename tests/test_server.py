@@ -0,0 +1,88 @@
+"""Humo del servidor MCP: el módulo importa y las herramientas responden."""
+import asyncio
+import sqlite3
+
+import main
+
+
+def _call(name: str, arguments: dict):
+    """Llama a una herramienta por el mismo camino que un cliente MCP."""
+    return asyncio.run(main.mcp.call_tool(name, arguments))
+
+
+def _team_code(db_path) -> str:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT t.code FROM teams t JOIN matches m ON m.team_a_no = t.no LIMIT 1"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_tools_are_registered():
+    names = {tool.name for tool in asyncio.run(main.mcp.list_tools())}
+    assert {"execute_query", "team_record", "search_entities", "server_stats"} <= names
+
+
+def test_team_record_tool(server_db):
+    code = _team_code(server_db)
+    _, structured = _call("team_record", {"team_code": code})
+    records = structured["result"]
+    assert records and all(record["code"] == code for record in records)
+
+
+def test_execute_query_tool(server_db):
+    _, structured = _call("execute_query", {"query": "SELECT COUNT(*) FROM matches", "format": "rows"})
+    assert structured["result"]["rows"] == [[400]]
+
+
+def test_dns_rebinding_protection_is_always_on(server_db):
+    main._start_server({"db": str(server_db), "warm_up": False})
+    security = main.mcp.settings.transport_security
+    assert security.enable_dns_rebinding_protection
+    assert "127.0.0.1:*" in security.allowed_hosts and "evil.example" not in security.allowed_hosts
+
+    main._start_server({"db": str(server_db), "warm_up": False, "allowed_hosts": ["voley.example.com"]})
+    security = main.mcp.settings.transport_security
+    assert {"localhost:*", "voley.example.com", "voley.example.com:*"} <= set(security.allowed_hosts)
+    assert "https://voley.example.com" in security.allowed_origins
+
+
+def test_search_entities_short_text(server_db):
+    # Códigos de dos letras, sin distinguir mayúsculas
+    for text in ("US", "us"):
+        _, structured = _call("search_entities", {"text": text})
+        results = structured["result"]
+        assert results[0]["code"] == "USA" and results[0]["kind"] == "team"
+        assert set(results[0]) == {"kind", "no", "name", "alt_name", "country", "code", "score"}
+        assert results[0]["score"] is None
+    # Acentos y mayúsculas normalizados como en el índice
+    for text in ("tü", "TÜ", "tu"):
+        _, structured = _call("search_entities", {"text": text})
+        assert "Türkiye" in {result["name"] for result in structured["result"]}
+    # Inicio de una palabra del nombre
+    _, structured = _call("search_entities", {"text": "Ri"})
+    assert "Puerto Rico" in {result["name"] for result in structured["result"]}
+
+
+def test_response_bytes_without_double_serialization(server_db, monkeypatch):
+    dumped = []
+    real_json_bytes = main._json_bytes
+    monkeypatch.setattr(main, "_json_bytes", lambda value: dumped.append(value) or real_json_bytes(value))
+    stats = main.get_query_stats()
+    before = stats.snapshot()["tools"].get("execute_query", {}).get("response_bytes", 0)
+
+    _, structured = _call("execute_query", {"query": "SELECT * FROM matches", "format": "rows",
+                                            "max_bytes": 10_000_000})
+    result = structured["result"]
+    # El tamaño registrado es el medido al ajustar el presupuesto, sin otra serialización en main
+    assert dumped == []
+    recorded = stats.snapshot()["tools"]["execute_query"]["response_bytes"] - before
+    assert recorded == real_json_bytes(result)
+
+    # Las listas grandes se estiman con una muestra
+    rows = [list(row) for row in result["rows"]]
+    estimate = main._response_bytes(rows)
+    assert all(len(value) <= main.RESPONSE_SIZE_SAMPLE for value in dumped)
+    assert abs(estimate - real_json_bytes(rows)) < 0.1 * real_json_bytes(rows)
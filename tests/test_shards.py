@@ -0,0 +1,71 @@
+"""Herramientas tipadas sobre una BD particionada con más shards de los que caben en una conexión."""
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+import db_connection
+import main
+from database_converter import VolleyballDBConverter, shard_json_to_db
+
+
+def _call(name: str, arguments: dict):
+    # Las filas empatadas en el ORDER BY pueden venir en cualquier orden
+    return sorted(asyncio.run(main.mcp.call_tool(name, arguments))[1]["result"], key=repr)
+
+
+@pytest.fixture(scope="module")
+def split_tournament(tmp_path_factory, volleyball_db):
+    """Dataset con la mitad de los partidos de un torneo en otra temporada (otro shard)."""
+    base = tmp_path_factory.mktemp("split")
+    with open(volleyball_db.parent / "matches.json", encoding="utf-8") as f:
+        data = json.load(f)
+    seasons = sorted({m["season"] for m in data["matches"]})
+    tournament = data["matches"][0]["tournamentNo"]
+    moved = [m for m in data["matches"] if m["tournamentNo"] == tournament][::2]
+    other = next(s for s in seasons if s != moved[0]["season"])
+    for match in moved:
+        match["season"] = other
+    path = base / "matches.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+    single = base / "single.db"
+    VolleyballDBConverter(str(single)).convert_json_to_db(str(path))
+    shard_json_to_db(str(path), str(base / "shards"))
+    return {"single": single, "manifest": base / "shards" / "manifest.json", "tournament": tournament,
+            "match": moved[0]}
+
+
+def test_batched_tools_match_single_database(split_tournament, monkeypatch):
+    conn = sqlite3.connect(split_tournament["single"])
+    team_a, team_b = conn.execute(
+        "SELECT ta.code, tb.code FROM matches m JOIN teams ta ON ta.no = m.team_a_no "
+        "JOIN teams tb ON tb.no = m.team_b_no WHERE m.match_no = ?",
+        (split_tournament["match"]["matchNo"],),
+    ).fetchone()
+    conn.close()
+    calls = [
+        ("pool_standings", {"tournament_no": split_tournament["tournament"]}),
+        ("head_to_head", {"team_code": team_a, "opponent_code": team_b}),
+        ("team_record", {"team_code": team_a}),
+        ("matches_by_team", {"team_code": team_a}),
+        ("tournament_schedule", {"tournament_no": split_tournament["tournament"]}),
+        ("match_sets", {"match_no": split_tournament["match"]["matchNo"]}),
+    ]
+
+    db_connection.configure_database(split_tournament["single"])
+    expected = {name: _call(name, arguments) for name, arguments in calls}
+
+    # Un shard por conexión: cada herramienta corre por grupos y une los resultados
+    monkeypatch.setattr(db_connection, "_attach_limit", 1)
+    db_connection.configure_database(split_tournament["manifest"])
+    try:
+        assert db_connection.shard_batches() is not None
+        for name, arguments in calls:
+            assert _call(name, arguments) == expected[name], name
+    finally:
+        db_connection.configure_database(split_tournament["single"])
+
+    standings = expected["pool_standings"]
+    assert len({(row["pool_code"], row["team_code"]) for row in standings}) == len(standings)